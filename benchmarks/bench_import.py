@@ -0,0 +1,58 @@
+"""
+Measures CLI start up time.
+Each command runs in a fresh interpreter; the eager case imports the
+persistence layer and creates its engine the way importing classes.dojo
+used to.
+
+    python -m benchmarks.bench_import --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [
+    ('import classes.dojo', ['-c', 'import classes.dojo']),
+    ('import classes.dojo with eager engine',
+     ['-c', 'import classes.dojo, modals.table_def; modals.table_def.get_engine()']),
+    ('main.py --help', [os.path.join(ROOT, 'main.py'), '--help']),
+]
+
+
+def bench_command(arguments, runs, directory):
+    """
+    Runs the interpreter with arguments several times
+    :param arguments:
+    :param runs:
+    :param directory: working directory, so no Dojo.db lands in the repo
+    :return: median seconds
+    """
+    environment = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, cwd=directory, env=environment,
+                       stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print('%-40s %12s' % ('command', 'median ms'))
+        for title, arguments in COMMANDS:
+            seconds = bench_command(arguments, args.runs, directory)
+            print('%-40s %12.1f' % (title, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
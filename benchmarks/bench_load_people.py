@@ -0,0 +1,31 @@
+"""
+Measures how load_people scales with the size of the roster.
+The campus grows with the roster, time per person should stay flat.
+
+    python -m benchmarks.bench_load_people --sizes 10000 100000 300000
+"""
+import argparse
+import shutil
+import tempfile
+
+from benchmarks.common import print_scaling
+from benchmarks.suite import bench_load_people
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 300000])
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = [(people, bench_load_people(people, directory, args.chunk_size)[0])
+                   for people in args.sizes]
+    finally:
+        shutil.rmtree(directory)
+    print_scaling('load_people', results)
+
+
+if __name__ == '__main__':
+    main()
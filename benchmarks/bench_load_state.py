@@ -0,0 +1,43 @@
+"""
+Measures how load_state scales with the number of people.
+Time per person should stay flat as the state grows.
+
+    python -m benchmarks.bench_load_state --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from benchmarks.common import populated_dojo, print_scaling, timed
+from classes.dojo import Dojo
+from classes.reporter import NullReporter
+
+
+def bench_load_state(people, directory):
+    """
+    Saves a populated Dojo and times loading it back
+    :param people:
+    :param directory:
+    :return: seconds taken by load_state
+    """
+    db = os.path.join(directory, 'bench%d' % people)
+    populated_dojo(people).save_state(db)
+    return timed(Dojo(NullReporter()).load_state, db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        results = [(people, bench_load_state(people, directory)) for people in args.sizes]
+    finally:
+        shutil.rmtree(directory)
+    print_scaling('load_state', results)
+
+
+if __name__ == '__main__':
+    main()
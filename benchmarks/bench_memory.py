@@ -0,0 +1,80 @@
+"""
+Compares bytes per person of the slotted domain model with the
+dict backed classes it replaced, which are reproduced below.
+
+    python -m benchmarks.bench_memory --people 100000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from classes.room import Fellow, Office, Staff
+
+
+class DictPerson:
+    def __init__(self, name, office):
+        self.name = name
+        self.office = office
+        self.db_id = None
+
+
+class DictOffice:
+    def __init__(self, name):
+        self.name = name
+        self.spaces = 6
+        self.occupants = []
+        self.db_id = None
+
+
+class DictFellow(DictPerson):
+    def __init__(self, name, wants_accommodation):
+        super().__init__(name, None)
+        self.living_place = None
+        self.wants_accomodation = wants_accommodation
+
+
+class DictStaff(DictPerson):
+    def __init__(self, name):
+        super().__init__(name, None)
+
+
+def bytes_per_person(people, office_class, fellow_class, staff_class):
+    """
+    Allocates people into offices and measures the memory they take
+    :param people:
+    :return: bytes per person, rooms included
+    """
+    names = ['person %d' % i for i in range(people)]
+    gc.collect()
+    tracemalloc.start()
+    offices = [office_class('office%d' % i) for i in range(people // 6 + 1)]
+    everyone = []
+    for i, name in enumerate(names):
+        if i % 2:
+            person = fellow_class(name, 'Y')
+        else:
+            person = staff_class(name)
+        office = offices[i // 6]
+        person.office = office
+        office.occupants.append(person)
+        everyone.append(person)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / people
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--people', type=int, default=100000)
+    args = parser.parse_args()
+
+    before = bytes_per_person(args.people, DictOffice, DictFellow, DictStaff)
+    after = bytes_per_person(args.people, Office, Fellow, Staff)
+    print('%-20s %16s' % ('model', 'bytes per person'))
+    print('%-20s %16.1f' % ('dict backed', before))
+    print('%-20s %16.1f' % ('slots', after))
+    print('%-20s %15.0f%%' % ('saving', (1 - after / before) * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares writing the allocations report by building one string with
+repeated concatenation, as print_allocations_to_file used to, against
+streaming it with iter_allocations_text.
+
+    python -m benchmarks.bench_reports --people 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import populated_dojo
+from classes.room import Office
+
+
+def concatenated_allocations_text(dojo):
+    """
+    The report as it used to be built
+    :param dojo:
+    :return:
+    """
+    rooms = dojo.all_offices + dojo.all_living_spaces
+    text = ''
+    for room in rooms:
+        if isinstance(room, Office):
+            room_type = 'Office '
+        else:
+            room_type = 'Living Space '
+
+        text += room_type + room.name.upper() + '\n'
+        text += '---------------------------------------------\n'
+        for person in room.occupants:
+            text += person.name + '(' + person.__str__() + ')' + ', '
+        text += '\n\n\n'
+    return text
+
+
+def write_concatenated(dojo, path):
+    with open(path, 'w') as file:
+        file.write(concatenated_allocations_text(dojo))
+
+
+def write_streamed(dojo, path):
+    with open(path, 'w') as file:
+        file.writelines(dojo.iter_allocations_text())
+
+
+def measure(function, dojo, path):
+    """
+    Runs a report writer
+    :return: (seconds, peak bytes allocated)
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(dojo, path)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--people', type=int, default=100000)
+    args = parser.parse_args()
+
+    dojo = populated_dojo(args.people)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'allocations.txt')
+        print('%-14s %10s %14s' % ('writer', 'seconds', 'peak MiB'))
+        for title, function in (('concatenated', write_concatenated),
+                                ('streamed', write_streamed)):
+            seconds, peak = measure(function, dojo, path)
+            print('%-14s %10.3f %14.2f' % (title, seconds, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
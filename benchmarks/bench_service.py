@@ -0,0 +1,98 @@
+"""
+Load generator for the Dojo service. Many clients send add_person
+requests one after another and the throughput and latency
+percentiles are reported. Without --port or --socket an in-process
+service is started on a free port.
+
+    python -m benchmarks.bench_service --clients 100 --requests 100
+    python -m benchmarks.bench_service --port 8765
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from classes.service import DojoService, start_service
+
+
+async def client(number, requests, open_connection, latencies):
+    """
+    Sends requests add_person requests, waiting for each answer
+    :param number: client number, keeps names unique
+    :param requests:
+    :param open_connection: coroutine function returning (reader, writer)
+    :param latencies: list the request latencies are added to
+    :return:
+    """
+    reader, writer = await open_connection()
+    for i in range(requests):
+        request = {'id': i, 'op': 'add_person',
+                   'args': {'name': 'client%d person%d' % (number, i),
+                            'person_type': 'FELLOW' if i % 2 else 'STAFF',
+                            'wants_accommodation': 'Y' if i % 4 == 1 else 'N'}}
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+    writer.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args):
+    server = service = None
+    if args.socket:
+        def open_connection():
+            return asyncio.open_unix_connection(args.socket)
+    else:
+        port = args.port
+        if port is None:
+            service = DojoService()
+            people = args.clients * args.requests
+            service.dojo.create_room(['office%d' % i for i in range(people // 6 + 1)],
+                                     'office')
+            service.dojo.create_room(['living%d' % i for i in range(people // 16 + 1)],
+                                     'living_space')
+            server = await start_service(service, port=0)
+            port = server.sockets[0].getsockname()[1]
+
+        def open_connection():
+            return asyncio.open_connection(args.host, port)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(number, args.requests, open_connection, latencies)
+                           for number in range(args.clients)])
+    seconds = time.perf_counter() - start
+
+    if server:
+        server.close()
+        await server.wait_closed()
+    latencies.sort()
+    print('%d requests from %d clients in %.2fs, %.0f requests per second'
+          % (len(latencies), args.clients, seconds, len(latencies) / seconds))
+    print('latency ms: p50 %.2f  p95 %.2f  p99 %.2f  max %.2f'
+          % tuple(1000 * percentile(latencies, fraction)
+                  for fraction in (0.5, 0.95, 0.99, 1.0)))
+    if service:
+        print('%d allocation batches, %.1f adds per batch'
+              % (service.batches, len(latencies) / service.batches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--socket', help='Unix socket of a running service')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures allocation throughput of a thread safe Dojo as worker
+threads are added.
+
+Each room pool has its own lock, so office and living space
+allocations only contend with allocations of the same kind. On a
+CPython build with the GIL the threads still take turns running
+bytecode, so expect throughput to stay flat rather than grow with
+the threads. Scaling needs a free-threaded build.
+
+    python -m benchmarks.bench_threads --people 100000 --threads 1 2 4 8
+"""
+import argparse
+import threading
+import time
+
+from classes.dojo import Dojo
+from classes.reporter import NullReporter
+
+
+def bench_threads(people, threads, thread_safe=True):
+    """
+    Adds people from several threads at once
+    :param people: total number of people added
+    :param threads: number of worker threads
+    :param thread_safe:
+    :return: people added per second
+    """
+    dojo = Dojo(NullReporter(), thread_safe=thread_safe)
+    dojo.create_room(['office%d' % i for i in range(people // 6 + 1)], 'office')
+    dojo.create_room(['living%d' % i for i in range(people // 8 + 1)], 'living_space')
+
+    def add_people(thread):
+        for i in range(thread, people, threads):
+            if i % 2:
+                dojo.add_staff('staff %d' % i)
+            else:
+                dojo.add_fellow('fellow %d' % i, 'Y')
+
+    workers = [threading.Thread(target=add_people, args=(thread,))
+               for thread in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return people / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--people', type=int, default=100000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    unlocked = bench_threads(args.people, 1, thread_safe=False)
+    print('%8s %16s' % ('threads', 'people per s'))
+    print('%8s %16.0f' % ('no locks', unlocked))
+    for threads in args.threads:
+        print('%8d %16.0f' % (threads, bench_threads(args.people, threads)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+import random
+import time
+
+from classes.dojo import Dojo
+from classes.reporter import NullReporter
+
+
+def populated_dojo(people):
+    """
+    Builds a quiet Dojo with enough rooms for everyone.
+    Half of the people are fellows and half of those want accommodation
+    :param people: number of people
+    :return Dojo:
+    """
+    dojo = Dojo(NullReporter())
+    dojo.create_room(['office%d' % i for i in range(people // 6 + 1)], 'office')
+    dojo.create_room(['living%d' % i for i in range(people // 16 + 1)], 'living_space')
+    cohort = []
+    for i in range(people):
+        if i % 2:
+            cohort.append(('staff %d' % i, 'STAFF', 'N'))
+        else:
+            cohort.append(('fellow %d' % i, 'FELLOW', 'Y' if i % 4 == 0 else 'N'))
+    dojo.allocate_batch(cohort)
+    return dojo
+
+
+def timed(function, *args, **kwargs):
+    """
+    Runs function once
+    :return: seconds taken
+    """
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def print_scaling(title, results):
+    """
+    Prints seconds and microseconds per person for each size
+    :param title:
+    :param results: list of (people, seconds)
+    :return:
+    """
+    print(title)
+    print('%10s %12s %16s' % ('people', 'seconds', 'us per person'))
+    for people, seconds in results:
+        print('%10d %12.4f %16.2f' % (people, seconds, seconds / people * 1e6))
+
+
+FIRST_NAMES = ('OLUWAFEMI', 'DOMINIC', 'SIMON', 'MARI', 'LEIGH', 'TANA', 'KELLY', 'JIM')
+LAST_NAMES = ('SULE', 'WALTERS', 'PATTERSON', 'LAWRENCE', 'RILEY', 'LOPEZ', 'MCGUCKIN')
+
+
+def synthetic_roster(people, seed=0):
+    """
+    Generates roster lines in the files/test.txt format.
+    Names are unique, about half of the people are fellows and
+    about half of those want accommodation
+    :param people: number of lines
+    :param seed: makes the roster reproducible
+    :return: generator of lines
+    """
+    rng = random.Random(seed)
+    for i in range(people):
+        name = '%s %s%d' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), i)
+        if rng.random() < 0.5:
+            yield '%s STAFF\n' % name
+        else:
+            yield '%s FELLOW %s\n' % (name, rng.choice('YN'))
+
+
+def write_roster(path, people, seed=0):
+    """
+    Writes a synthetic roster file
+    :param path:
+    :param people:
+    :param seed:
+    :return:
+    """
+    with open(path, 'w') as file:
+        file.writelines(synthetic_roster(people, seed))
@@ -0,0 +1,205 @@
+"""
+Reproducible benchmark suite for the main Dojo operations.
+Every operation is timed at each size and the results can be written
+as JSON and compared against an earlier run to catch regressions.
+
+    python -m benchmarks.suite --sizes 1000 10000 100000 1000000 --json run.json
+    python -m benchmarks.suite --compare baseline.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+
+from benchmarks.common import populated_dojo, timed, write_roster
+from classes.dojo import Dojo
+from classes.reporter import NullReporter
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def room_names(people):
+    """
+    Names of enough offices and living spaces for people
+    :param people:
+    :return: (office names, living space names)
+    """
+    return (['office%d' % i for i in range(people // 6 + 1)],
+            ['living%d' % i for i in range(people // 8 + 1)])
+
+
+def bench_create_room(people, directory):
+    dojo = Dojo(NullReporter())
+    offices, living_spaces = room_names(people)
+
+    def create_rooms():
+        dojo.create_room(offices, 'office')
+        dojo.create_room(living_spaces, 'living_space')
+    return timed(create_rooms), len(offices) + len(living_spaces)
+
+
+def bench_add_person(people, directory):
+    dojo = Dojo(NullReporter())
+    offices, living_spaces = room_names(people)
+    dojo.create_room(offices, 'office')
+    dojo.create_room(living_spaces, 'living_space')
+
+    def add_people():
+        for i in range(people):
+            if i % 2:
+                dojo.add_staff('staff %d' % i)
+            else:
+                dojo.add_fellow('fellow %d' % i, 'Y' if i % 4 == 0 else 'N')
+    return timed(add_people), people
+
+
+def bench_load_people(people, directory, chunk_size=1000):
+    path = os.path.join(directory, 'roster%d.txt' % people)
+    write_roster(path, people)
+    dojo = Dojo(NullReporter())
+    offices, living_spaces = room_names(people)
+    dojo.create_room(offices, 'office')
+    dojo.create_room(living_spaces, 'living_space')
+    return timed(dojo.load_people, path, chunk_size), people
+
+
+def bench_re_allocate_person(people, directory):
+    dojo = populated_dojo(people)
+    spare = ['spare%d' % i for i in range(people // 60 + 1)]
+    dojo.create_room(spare, 'office')
+    moves = [('staff %d' % i, spare[n % len(spare)])
+             for n, i in enumerate(range(1, people, 10))]
+
+    def re_allocate():
+        for person_name, room_name in moves:
+            dojo.re_allocate_person(person_name, room_name)
+    return timed(re_allocate), len(moves)
+
+
+def bench_allocations_text(people, directory):
+    dojo = populated_dojo(people)
+    return timed(dojo.allocations_text), people
+
+
+def bench_save_state(people, directory):
+    # keep the one-off sqlalchemy import out of the timing
+    import modals.table_def  # noqa: F401
+    dojo = populated_dojo(people)
+    return timed(dojo.save_state, os.path.join(directory, 'save%d' % people)), people
+
+
+def bench_load_state(people, directory):
+    db = os.path.join(directory, 'load%d' % people)
+    populated_dojo(people).save_state(db)
+    return timed(Dojo(NullReporter()).load_state, db), people
+
+
+def bench_save_snapshot(people, directory):
+    dojo = populated_dojo(people)
+    path = os.path.join(directory, 'save%d.snapshot' % people)
+    return timed(dojo.save_snapshot, path), people
+
+
+def bench_load_snapshot(people, directory):
+    path = os.path.join(directory, 'load%d.snapshot' % people)
+    populated_dojo(people).save_snapshot(path)
+    return timed(Dojo(NullReporter()).load_snapshot, path), people
+
+
+BENCHMARKS = {
+    'create_room': bench_create_room,
+    'add_person': bench_add_person,
+    'load_people': bench_load_people,
+    're_allocate_person': bench_re_allocate_person,
+    'allocations_text': bench_allocations_text,
+    'save_state': bench_save_state,
+    'load_state': bench_load_state,
+    'save_snapshot': bench_save_snapshot,
+    'load_snapshot': bench_load_snapshot,
+}
+
+
+def run(names, sizes, repeat=1):
+    """
+    Runs benchmarks, keeping the best of repeat runs
+    :param names: benchmark names
+    :param sizes: numbers of people
+    :param repeat:
+    :return: dict of name -> size -> {seconds, operations}
+    """
+    results = {}
+    directory = tempfile.mkdtemp()
+    try:
+        for name in names:
+            results[name] = {}
+            for people in sizes:
+                runs = [BENCHMARKS[name](people, directory) for _ in range(repeat)]
+                seconds, operations = min(runs)
+                results[name][str(people)] = {'seconds': seconds,
+                                              'operations': operations}
+                print('%-20s %10d %12.4f %14.2f' % (name, people, seconds,
+                                                   seconds / operations * 1e6))
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints how each result moved against a baseline run
+    :param results:
+    :param baseline: results of an earlier run
+    :param threshold: ratio above which a result counts as a regression
+    :return: list of (name, size, ratio) regressions
+    """
+    regressions = []
+    print('%-20s %10s %10s' % ('benchmark', 'people', 'ratio'))
+    for name, sizes in results.items():
+        for people, result in sizes.items():
+            before = baseline.get(name, {}).get(people)
+            if not before:
+                continue
+            ratio = ((result['seconds'] / result['operations']) /
+                     (before['seconds'] / before['operations']))
+            flag = ''
+            if ratio > threshold:
+                regressions.append((name, people, ratio))
+                flag = '  regression'
+            print('%-20s %10s %10.2f%s' % (name, people, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS),
+                        default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+
+    print('%-20s %10s %12s %14s' % ('benchmark', 'people', 'seconds', 'us per op'))
+    results = run(args.only, args.sizes, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'date': datetime.datetime.now().isoformat(),
+                       'results': results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+Columnar allocation store for very large campuses.
+Rooms and people are integer ids into NumPy arrays instead of objects,
+so allocation, unallocated queries and reports are array operations.
+numpy is only needed when this backend is used.
+"""
+import click
+
+from classes.reporter import ConsoleReporter
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+OFFICE = 0
+LIVING_SPACE = 1
+FELLOW = 0
+STAFF = 1
+UNALLOCATED = -1
+ROOM_TYPES = {'office': OFFICE, 'living_space': LIVING_SPACE}
+CAPACITIES = {OFFICE: 6, LIVING_SPACE: 4}
+
+
+def assign_slots(free_spaces, count, rng):
+    """
+    Picks count free spaces uniformly at random in one step
+    :param free_spaces: array of free spaces per room
+    :param count: number of people to place
+    :param rng: numpy Generator
+    :return: array of count room indexes, -1 for people left without a space
+    """
+    slots = np.repeat(np.arange(len(free_spaces)), np.maximum(free_spaces, 0))
+    if count < len(slots):
+        return rng.choice(slots, count, replace=False)
+    rooms = np.full(count, UNALLOCATED, dtype=np.int64)
+    rooms[:len(slots)] = rng.permutation(slots)
+    return rooms
+
+
+class Column:
+    """
+    Growable NumPy array
+    """
+
+    def __init__(self, dtype):
+        self.data = np.zeros(16, dtype=dtype)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def values(self):
+        return self.data[:self.size]
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.data.dtype)
+        end = self.size + len(values)
+        if end > len(self.data):
+            data = np.zeros(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            data[:self.size] = self.values
+            self.data = data
+        self.data[self.size:end] = values
+        self.size = end
+
+
+class ColumnarDojo:
+    """
+    Dojo backed by NumPy arrays.
+    Supports the creation, allocation and reporting parts of the Dojo API
+    """
+
+    def __init__(self, reporter=None, seed=None):
+        if np is None:
+            raise ImportError('The columnar backend needs numpy installed')
+        self.reporter = reporter or ConsoleReporter()
+        self.rng = np.random.default_rng(seed)
+
+        self.room_names = []
+        self.room_ids = {}
+        self.room_type = Column(np.int8)
+        self.room_capacity = Column(np.int32)
+        self.room_occupancy = Column(np.int32)
+
+        self.person_names = []
+        self.person_type = Column(np.int8)
+        self.wants_accomodation = Column(np.bool_)
+        self.person_office = Column(np.int64)
+        self.person_living_space = Column(np.int64)
+
+    def create_room(self, room_names, room_type):
+        """Creates either an office or living space
+           depending on the room_type passed
+        """
+        if not isinstance(room_names, list) or not isinstance(room_type, str):
+            raise TypeError('Arguments should be a list and string respectively')
+        elif not room_names:
+            raise ValueError('List of room names can not be empty')
+        elif room_type not in ROOM_TYPES:
+            self.reporter.emit('invalid_room_type', 'error', 'Invalid room type',
+                               room_type=room_type)
+            return
+
+        new_names = []
+        for room_name in room_names:
+            if room_name in self.room_ids:
+                self.reporter.emit('room_exists', 'error',
+                                   '%(room_type)s %(room)s already exists, '
+                                   'choose another name',
+                                   room_type=room_type, room=room_name)
+            else:
+                self.room_ids[room_name] = len(self.room_names)
+                self.room_names.append(room_name)
+                new_names.append(room_name)
+
+        kind = ROOM_TYPES[room_type]
+        self.room_type.extend(np.full(len(new_names), kind))
+        self.room_capacity.extend(np.full(len(new_names), CAPACITIES[kind]))
+        self.room_occupancy.extend(np.zeros(len(new_names)))
+        self.reporter.emit('rooms_created', 'success',
+                           '-------------%(count)d %(room_type)s rooms have been created',
+                           count=len(new_names), room_type=room_type)
+
+    def add_fellow(self, name, wants_accomodation='N'):
+        """Adds fellow to an office and or living space"""
+        return self.allocate_batch([(name, 'FELLOW', wants_accomodation)])[0]
+
+    def add_staff(self, name):
+        """Add staff to an office"""
+        return self.allocate_batch([(name, 'STAFF', 'N')])[0]
+
+    def allocate_batch(self, people):
+        """
+        Adds a whole cohort of people, allocating all of them
+        with one vectorized draw per room type
+        :param people: iterable of (name, person_type, wants_accomodation)
+        :return: array of the new person ids
+        """
+        names = []
+        types = []
+        wants = []
+        rejected = 0
+        for name, person_type, wants_accomodation in people:
+            if person_type not in ('FELLOW', 'STAFF'):
+                rejected += 1
+                continue
+            names.append(name)
+            types.append(FELLOW if person_type == 'FELLOW' else STAFF)
+            wants.append(person_type == 'FELLOW' and wants_accomodation in (True, 'Y'))
+
+        first = len(self.person_names)
+        ids = np.arange(first, first + len(names))
+        wants = np.array(wants, dtype=np.bool_)
+        offices = self.allocate(OFFICE, len(names))
+        living_spaces = np.full(len(names), UNALLOCATED, dtype=np.int64)
+        living_spaces[wants] = self.allocate(LIVING_SPACE, int(wants.sum()))
+
+        self.person_names.extend(names)
+        self.person_type.extend(types)
+        self.wants_accomodation.extend(wants)
+        self.person_office.extend(offices)
+        self.person_living_space.extend(living_spaces)
+
+        self.reporter.emit('batch_allocated', 'info',
+                           '----------------%(people)d people have been added, '
+                           '%(unallocated_office)d unallocated office, '
+                           '%(unallocated_living_space)d unallocated living space',
+                           people=len(names), rejected=rejected,
+                           unallocated_office=int((offices == UNALLOCATED).sum()),
+                           unallocated_living_space=int(
+                               (living_spaces[wants] == UNALLOCATED).sum()))
+        return ids
+
+    def allocate(self, kind, count):
+        """
+        Draws count random free spaces in rooms of a kind
+        and counts the new occupants
+        :param kind: OFFICE or LIVING_SPACE
+        :param count:
+        :return: array of room ids, -1 where no space was left
+        """
+        rooms = np.flatnonzero(self.room_type.values == kind)
+        free = self.room_capacity.values[rooms] - self.room_occupancy.values[rooms]
+        picks = assign_slots(free, count, self.rng)
+        allocated = picks != UNALLOCATED
+        room_ids = np.full(count, UNALLOCATED, dtype=np.int64)
+        room_ids[allocated] = rooms[picks[allocated]]
+        self.room_occupancy.data[:len(self.room_occupancy)] += np.bincount(
+            room_ids[allocated], minlength=len(self.room_occupancy)).astype(np.int32)
+        return room_ids
+
+    def unallocated(self):
+        """
+        Gets the ids of people waiting for rooms
+        :return: (fellows without office, fellows without living space,
+                  staff without office)
+        """
+        no_office = self.person_office.values == UNALLOCATED
+        fellows = self.person_type.values == FELLOW
+        no_living_space = (self.wants_accomodation.values &
+                           (self.person_living_space.values == UNALLOCATED))
+        return (np.flatnonzero(no_office & fellows),
+                np.flatnonzero(no_living_space),
+                np.flatnonzero(no_office & ~fellows))
+
+    def occupants(self, room_id):
+        """
+        Gets the ids of people in a room
+        :param room_id:
+        :return: array of person ids
+        """
+        if self.room_type.values[room_id] == OFFICE:
+            return np.flatnonzero(self.person_office.values == room_id)
+        return np.flatnonzero(self.person_living_space.values == room_id)
+
+    def print_room(self, room_name):
+        """Print names of people in room
+           on the screen
+        """
+        if not isinstance(room_name, str):
+            raise TypeError('Room name should be a string')
+        elif not room_name:
+            return 'Room name can not be empty'
+        elif room_name not in self.room_ids:
+            print('Room ' + room_name + ' does not exist')
+            return None
+
+        click.secho('-------------' + room_name + '-------------', fg='cyan', bold=True)
+        people = self.occupants(self.room_ids[room_name])
+        if not len(people):
+            click.secho('Room is currently empty', fg='red', bold=True)
+        for person_id in people:
+            click.secho(self.person_names[person_id], fg='green', bold=True)
+
+    def allocations_text(self):
+        """
+        generates text of all room allocations, in the same
+        format as Dojo.allocations_text
+        :return:
+        """
+        labels = ('(Fellow), ', '(Staff), ')
+        names = self.person_names
+        types = self.person_type.values
+        room_type = self.room_type.values
+        rooms = np.concatenate([np.flatnonzero(room_type == OFFICE),
+                                np.flatnonzero(room_type == LIVING_SPACE)])
+        by_room = {}
+        for kind, assignment in ((OFFICE, self.person_office.values),
+                                 (LIVING_SPACE, self.person_living_space.values)):
+            # a stable sort keeps occupants in the order they were added
+            order = np.argsort(assignment, kind='stable')
+            order = order[assignment[order] != UNALLOCATED]
+            bounds = np.flatnonzero(np.diff(assignment[order])) + 1
+            for group in np.split(order, bounds):
+                if len(group):
+                    by_room[int(assignment[group[0]])] = group
+
+        parts = []
+        for room_id in rooms:
+            title = 'Office ' if room_type[room_id] == OFFICE else 'Living Space '
+            parts.append(title + self.room_names[room_id].upper() + '\n')
+            parts.append('---------------------------------------------\n')
+            for person_id in by_room.get(int(room_id), ()):
+                parts.append(names[person_id] + labels[types[person_id]])
+            parts.append('\n\n\n')
+        return ''.join(parts)
+
+    def un_allocations_text(self):
+        """
+        generates text of people not allocated room space, in the
+        same format as Dojo.un_allocations_text
+        :return:
+        """
+        no_office, no_living_space, staff = self.unallocated()
+        names = self.person_names
+        parts = [names[i].upper() + ', Fellow Unallocated Office\n' for i in no_office]
+        parts += [names[i].upper() + ', Fellow Unallocated living space\n'
+                  for i in no_living_space]
+        parts += [names[i].upper() + ', Staff Unallocated Office\n' for i in staff]
+        return ''.join(parts)
+
+    def print_allocations(self):
+        """Print space allocations to screen"""
+        text = self.allocations_text()
+        if not text:
+            click.secho('No persons are currently allocated rooms', fg='red', bold=True)
+        else:
+            click.secho(text, fg='cyan', bold=True)
+
+    def print_un_allocations(self):
+        """Print spaces not allocated to screen"""
+        text = self.un_allocations_text()
+        if not text:
+            click.secho('No persons are currently not allocated rooms',
+                        fg='red', bold=True)
+        else:
+            click.secho(text, fg='cyan', bold=True)
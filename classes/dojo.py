@@ -1,37 +1,127 @@
-import os
-
 from classes.room import Office, LivingSpace, Fellow, Staff
-from modals.table_def import OfficeModel, FellowModel, StaffModel, LivingSpaceModel
-from modals.table_def import engine
-from random import shuffle
+from classes.pool import RoomPool, WaitingList, oldest_waiting
+from classes.roster import LoadReport, parse_roster, chunked
+from classes.reporter import ConsoleReporter
+from classes.matching import assign_with_preferences
+from classes.journal import Journal
+from classes.snapshot import write_snapshot, load_snapshot
 import click
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from contextlib import nullcontext
+from functools import wraps
+from itertools import count
+from random import sample
+from threading import RLock
 from typing import Union
 
 
+LOAD_BATCH_SIZE = 10000
+ALLOCATION_STRATEGIES = ('random', 'numpy')
+REPORT_CHUNK_SIZE = 65536
+BACKFILL_POLICIES = ('fifo', 'random')
+
+
+class AllocationResult:
+    """
+    Outcome of allocating a batch of people
+    """
+
+    def __init__(self):
+        self.fellows = []
+        self.staff = []
+        self.unallocated_office = []
+        self.unallocated_living_space = []
+        self.rejected = []
+
+    def __len__(self):
+        return len(self.fellows) + len(self.staff)
+
+
+class ReallocationResult:
+    """
+    Outcome of reallocating several people at once
+    """
+
+    def __init__(self):
+        self.moved = []
+        self.errors = []
+
+
+def exclusive(method):
+    """
+    Runs a Dojo method holding every lock, taken in the same order
+    as everywhere else: offices, living spaces, then the registries
+    """
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.free_offices.lock, self.free_living_spaces.lock, self.registry_lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def checkpointed(method):
+    """
+    Compacts the journal after a Dojo method if it has grown enough.
+    Runs outside of the method so no locks are held
+    """
+    @wraps(method)
+    def checkpoint(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if self.journal and self.journal.due_for_compaction():
+            self.compact_journal()
+        return result
+    return checkpoint
+
+
 class Dojo:
     """
     Dojo class to handle all responsibilities of the dojo
     """
 
-    def __init__(self):
+    def __init__(self, reporter=None, auto_backfill=False, thread_safe=False):
         """
         Initialise lists and dictionaries to to hold data
         for different objects
+        :param reporter: receives allocation events, prints them
+                         to the terminal by default
+        :param auto_backfill: policy, 'fifo' or 'random', used to move waiting
+                              people into new rooms as soon as they are created.
+                              Off by default
+        :param thread_safe: guard the Dojo with locks so several threads can
+                            serve requests. Each room pool has its own lock,
+                            covering its rooms and waiting lists, and the name
+                            registries share another. Off by default
         """
+        new_lock = RLock if thread_safe else nullcontext
 
         self.all_offices = []
-        self.fellows_not_allocated_office = []
-        self.fellows_not_allocated_living_space = []
-        self.staff_not_allocated = []
+        # the waiting lists share tickets so they can be drained oldest first
+        tickets = count()
+        self.fellows_not_allocated_office = WaitingList(tickets)
+        self.fellows_not_allocated_living_space = WaitingList(tickets)
+        self.staff_not_allocated = WaitingList(tickets)
+        self.auto_backfill = auto_backfill
         self.all_living_spaces = []
         self.all_fellows = []
         self.all_staff = []
-
-    def create_room(self, room_names, room_type):
+        self.free_offices = RoomPool(new_lock())
+        self.free_living_spaces = RoomPool(new_lock())
+        self.rooms = {}
+        self.people = {}
+        self.registry_lock = new_lock()
+        self.journal = None
+        self.reporter = reporter or ConsoleReporter()
+        self.dirty_objects = {}
+        self.saved_to = None
+        self.numpy_rng = None
+
+    @checkpointed
+    @exclusive
+    def create_room(self, room_names, room_type, backfill=None):
         """Creates either an office or living space 
            depending on the room_type passed 
+           :param backfill: policy used to fill the new rooms from the
+                            waiting lists, defaults to auto_backfill.
+                            False leaves the waiting lists alone
         """
         if not isinstance(room_names, list) or not isinstance(room_type, str):
             raise TypeError('Arguments should be a list and string respectively')
@@ -40,19 +130,20 @@ class Dojo:
             raise ValueError('List of room names can not be empty')
 
         else:
-            rooms = self.all_offices + self.all_living_spaces
+            backfill = self.auto_backfill if backfill is None else backfill
+            if backfill not in (False, None, True) + BACKFILL_POLICIES:
+                raise ValueError('Backfill policy should be one of %s'
+                                 % ', '.join(BACKFILL_POLICIES))
             for room_name in room_names:
-                if not rooms:
-                    self.create_an_office_or_a_living_space(room_type, room_name)
-                    rooms = self.all_offices + self.all_living_spaces
-
+                if self.is_room_exists(room_name):
+                    self.reporter.emit('room_exists', 'error',
+                                       '%(room_type)s %(room)s already exists, '
+                                       'choose another name',
+                                       room_type=room_type, room=room_name)
                 else:
-                    if self.is_room_exists(room_name):
-                        click.secho('%s %s already exists, choose another name'
-                                    % (room_type, room_name),
-                                    fg='red', bold=True)
-                    else:
-                        self.create_an_office_or_a_living_space(room_type, room_name)
+                    self.create_an_office_or_a_living_space(room_type, room_name)
+            if backfill:
+                self.fill_from_waiting_lists(backfill)
 
     def is_room_exists(self, room_name):
         """
@@ -60,11 +151,7 @@ class Dojo:
         :param room_name: 
         :return boolean: 
         """
-        rooms = self.all_offices + self.all_living_spaces
-        for room in rooms:
-            if room_name == room.name:
-                return True
-        return False
+        return room_name in self.rooms
 
     def create_an_office_or_a_living_space(self, room_type, room_name):
         """
@@ -75,20 +162,23 @@ class Dojo:
         """
         if room_type == 'office':
             office = Office(room_name)
-            self.all_offices.append(office)
-            click.secho('-------------Office %s has been created'
-                        '----------------' % room_name, fg='green', bold=True)
+            self.register_room(office)
+            self.reporter.emit('office_created', 'success',
+                               '-------------Office %(room)s has been created'
+                               '----------------', room=room_name)
 
         elif room_type == 'living_space':
             living_space = LivingSpace(room_name)
-            self.all_living_spaces.append(living_space)
-            click.secho('-------------Living space %s'
-                        ' has been created----------------'
-                        % room_name, fg='green', bold=True)
+            self.register_room(living_space)
+            self.reporter.emit('living_space_created', 'success',
+                               '-------------Living space %(room)s'
+                               ' has been created----------------', room=room_name)
 
         else:
-            click.secho('Invalid room type', fg='red', bold=True)
+            self.reporter.emit('invalid_room_type', 'error', 'Invalid room type',
+                               room_type=room_type, room=room_name)
 
+    @checkpointed
     def add_fellow(self, name, wants_accomodation='N'):
         """
         Adds fellow to an office and or living space
@@ -98,39 +188,48 @@ class Dojo:
         """
 
         fellow = Fellow(name, wants_accomodation)
-        available_office = self.get_available_office()
+        # registered and placed under the pool locks together, so nothing
+        # holding every lock sees a fellow that is only half added
+        living_space_lock = (self.free_living_spaces.lock if fellow.wants_accomodation
+                             else nullcontext())
+        with self.free_offices.lock, living_space_lock:
+            self.register_person(fellow)
+            available_office = self.take_free_room(fellow, self.free_offices,
+                                                   self.fellows_not_allocated_office)
+            if fellow.wants_accomodation:
+                available_living_space = self.take_free_room(
+                    fellow, self.free_living_spaces,
+                    self.fellows_not_allocated_living_space)
 
         if available_office:
-            self.add_person_to_room(fellow, available_office)
-            fellow.office = available_office
-            click.secho('----------------Fellow %s has been added to office %s'
-                        % (name, available_office.name), fg='cyan', bold=True)
+            self.reporter.emit('fellow_added', 'info',
+                               '----------------Fellow %(name)s has been added '
+                               'to office %(room)s',
+                               name=name, room=available_office.name)
 
         else:
-            self.fellows_not_allocated_office.append(fellow)
-            click.secho('----------------Fellow %s has been added'
-                        % name, fg='cyan', bold=True)
-            click.secho('----------------Fellow %s is currently '
-                        'unallocated office' % name, fg='yellow', bold=True)
-
-        if wants_accomodation == 'Y':
-            available_living_space = self.get_available_living_spaces()
-
+            self.reporter.emit('fellow_added', 'info',
+                               '----------------Fellow %(name)s has been added',
+                               name=name, room=None)
+            self.reporter.emit('fellow_unallocated_office', 'warning',
+                               '----------------Fellow %(name)s is currently '
+                               'unallocated office', name=name)
+
+        if fellow.wants_accomodation:
             if available_living_space:
-                self.add_person_to_room(fellow, available_living_space)
-                fellow.living_place = available_living_space
-                click.secho('----------------Fellow %s has been added to living space %s'
-                            % (name, available_living_space.name), fg='cyan', bold=True)
+                self.reporter.emit('fellow_added_living_space', 'info',
+                                   '----------------Fellow %(name)s has been added '
+                                   'to living space %(room)s',
+                                   name=name, room=available_living_space.name)
 
             else:
-                self.fellows_not_allocated_living_space.append(fellow)
-                click.secho('----------------Fellow %s is currently '
-                            'unallocated living space' % name, fg='yellow', bold=True)
+                self.reporter.emit('fellow_unallocated_living_space', 'warning',
+                                   '----------------Fellow %(name)s is currently '
+                                   'unallocated living space', name=name)
 
-        # Append fellow to list of fellows
-        self.all_fellows.append(fellow)
         return fellow
 
+    @checkpointed
     def add_staff(self, name):
         """
         Add staff to an office
@@ -139,56 +238,325 @@ class Dojo:
         """
 
         staff = Staff(name)
-        available_office = self.get_available_office()
+        with self.free_offices.lock:
+            self.register_person(staff)
+            available_office = self.take_free_room(staff, self.free_offices,
+                                                   self.staff_not_allocated)
 
         # If there is a free office
         if available_office:
-            self.add_person_to_room(staff, available_office)
-            staff.office = available_office
-            click.secho('----------------Staff %s has been added to office %s'
-                        % (name, available_office.name), fg='cyan', bold=True)
+            self.reporter.emit('staff_added', 'info',
+                               '----------------Staff %(name)s has been added '
+                               'to office %(room)s',
+                               name=name, room=available_office.name)
 
         else:
-            self.staff_not_allocated.append(staff)
-            click.secho('----------------Staff %s has been added'
-                        % name, fg='cyan', bold=True)
-            click.secho('----------------Staff %s is currently '
-                        'unallocated Living space' % name, fg='yellow', bold=True)
+            self.reporter.emit('staff_added', 'info',
+                               '----------------Staff %(name)s has been added',
+                               name=name, room=None)
+            self.reporter.emit('staff_unallocated_office', 'warning',
+                               '----------------Staff %(name)s is currently '
+                               'unallocated office', name=name)
 
-        self.all_staff.append(staff)
         return staff
 
+    @checkpointed
+    @exclusive
+    def allocate_batch(self, people, strategy='random', preferences=None):
+        """
+        Adds a whole cohort of people in one pass.
+        Free spaces are sampled once for the whole batch and
+        dealt out to the people instead of searching for a room
+        per person
+        :param people: iterable of (name, person_type, wants_accomodation)
+        :param strategy: 'random' samples spaces in Python, 'numpy'
+                         draws them with one vectorized permutation
+        :param preferences: dict of person name -> room names, best first.
+                            When given, the batch is placed with a min cost
+                            matching that fills as many spaces as possible and
+                            then gives people the best ranked rooms it can,
+                            strategy is ignored
+        :return AllocationResult:
+        """
+        if strategy not in ALLOCATION_STRATEGIES:
+            raise ValueError('Allocation strategy should be one of %s'
+                             % ', '.join(ALLOCATION_STRATEGIES))
+        result = AllocationResult()
+        office_seekers = []
+        living_space_seekers = []
+
+        # every row is checked before anyone is registered, so a bad
+        # row leaves the Dojo as it was
+        for name, person_type, wants_accomodation in people:
+            if not isinstance(name, str):
+                raise TypeError('Person name should be a string')
+            if person_type == 'FELLOW':
+                person = Fellow(name, wants_accomodation)
+                result.fellows.append(person)
+                if person.wants_accomodation:
+                    living_space_seekers.append(person)
+            elif person_type == 'STAFF':
+                person = Staff(name)
+                result.staff.append(person)
+            else:
+                result.rejected.append(name)
+                continue
+            office_seekers.append(person)
+
+        for person in office_seekers:
+            self.register_person(person)
+
+        office_preferences = living_space_preferences = None
+        if preferences is not None:
+            office_preferences = self.preferred_rooms(office_seekers, preferences, Office)
+            living_space_preferences = self.preferred_rooms(living_space_seekers,
+                                                            preferences, LivingSpace)
+
+        for person, office in self.deal_rooms(office_seekers, self.free_offices,
+                                              strategy, office_preferences):
+            if office:
+                self.add_person_to_room(person, office)
+                person.office = office
+            elif isinstance(person, Fellow):
+                self.join_waiting_list(person, self.fellows_not_allocated_office)
+                result.unallocated_office.append(person)
+            else:
+                self.join_waiting_list(person, self.staff_not_allocated)
+                result.unallocated_office.append(person)
+
+        for person, living_space in self.deal_rooms(living_space_seekers,
+                                                    self.free_living_spaces, strategy,
+                                                    living_space_preferences):
+            if living_space:
+                self.add_person_to_room(person, living_space)
+                person.living_place = living_space
+            else:
+                self.join_waiting_list(person, self.fellows_not_allocated_living_space)
+                result.unallocated_living_space.append(person)
+
+        self.reporter.emit('batch_allocated', 'info',
+                           '----------------%(fellows)d fellows and %(staff)d staff '
+                           'have been added, %(unallocated_office)d unallocated office, '
+                           '%(unallocated_living_space)d unallocated living space',
+                           fellows=len(result.fellows), staff=len(result.staff),
+                           unallocated_office=len(result.unallocated_office),
+                           unallocated_living_space=len(result.unallocated_living_space))
+        return result
+
+    def preferred_rooms(self, people, preferences, room_type):
+        """
+        Resolves the preferred room names of people to rooms of a type.
+        Unknown rooms and rooms of the other type are skipped
+        :param people:
+        :param preferences: dict of person name -> room names
+        :param room_type: Office or LivingSpace
+        :return: dict of person -> list of rooms, best first
+        """
+        resolved = {}
+        for person in people:
+            rooms = [self.rooms.get(room_name)
+                     for room_name in preferences.get(person.name, ())]
+            rooms = [room for room in rooms if isinstance(room, room_type)]
+            if rooms:
+                resolved[person] = rooms
+        return resolved
+
+    def deal_rooms(self, people, pool, strategy='random', preferences=None):
+        """
+        Pairs people with randomly sampled free spaces in the pool.
+        People left over once the spaces run out are paired with None.
+        Spaces are drawn from the pool's tree of free spaces, so the
+        cost follows the number of people rather than the number of rooms
+        :param people:
+        :param pool:
+        :param strategy: 'random' or 'numpy'
+        :param preferences: dict of person -> rooms, best first. Pairs people
+                            by min cost matching instead of sampling
+        :return: list of (person, room) pairs
+        """
+        if preferences is not None:
+            return assign_with_preferences(people, list(pool), preferences)
+        if strategy == 'numpy':
+            return list(zip(people, self.deal_rooms_numpy(len(people), list(pool))))
+
+        slots = pool.draw_spaces(len(people))
+        slots.extend([None] * (len(people) - len(slots)))
+        return list(zip(people, slots))
+
+    def deal_rooms_numpy(self, count, rooms):
+        """
+        Draws count free spaces from rooms by permuting the
+        expanded array of free slots with NumPy
+        :param count:
+        :param rooms:
+        :return: list of rooms, None where no space was left
+        """
+        import numpy as np
+        from classes.columnar import assign_slots
+
+        if self.numpy_rng is None:
+            self.numpy_rng = np.random.default_rng()
+        free_spaces = np.fromiter((room.spaces for room in rooms), dtype=np.int64,
+                                  count=len(rooms))
+        picks = assign_slots(free_spaces, count, self.numpy_rng)
+        return [rooms[pick] if pick >= 0 else None for pick in picks.tolist()]
+
+    def register_room(self, room):
+        """
+        Adds room to the list of its type and to the
+        pool of free rooms if it still has space
+        :param room:
+        :return:
+        """
+        pool = self.get_free_pool(room)
+        with pool.lock:
+            with self.registry_lock:
+                if isinstance(room, Office):
+                    self.all_offices.append(room)
+                else:
+                    self.all_living_spaces.append(room)
+                self.rooms[room.name] = room
+            if room.contains_space():
+                pool.add(room)
+            self.mark_dirty(room)
+            if self.journal:
+                self.journal.record(room)
+
+    def register_person(self, person):
+        """
+        Adds person to the list of their type and to the
+        registry of people. When names clash the first person
+        registered keeps the name
+        :param person:
+        :return:
+        """
+        with self.registry_lock:
+            if isinstance(person, Fellow):
+                self.all_fellows.append(person)
+            else:
+                self.all_staff.append(person)
+            self.people.setdefault(person.name, person)
+            self.mark_dirty(person)
+        if self.journal:
+            self.journal.record(person)
+
+    def mark_dirty(self, obj):
+        """
+        Flags a room or person as changed since the last save
+        :param obj:
+        :return:
+        """
+        with self.registry_lock:
+            self.dirty_objects[obj] = None
+
+    def get_free_pool(self, room):
+        """
+        Gets the pool of free rooms that room belongs to
+        :param room:
+        :return:
+        """
+        if isinstance(room, Office):
+            return self.free_offices
+        return self.free_living_spaces
+
     def get_available_office(self) -> Union[bool, Office]:
         """
-        Check if offices still have available spaces
+        Picks a random office that still has available spaces
         :return: 
         """
-        shuffle(self.all_offices)
-        for office in self.all_offices:
-            if office.contains_space():
-                return office
-        return False
+        return self.free_offices.pick() or False
+
+    def take_free_room(self, person, pool, waiting_list):
+        """
+        Picks a free room from pool and adds person to it in one step
+        under the pool lock, or puts them on waiting_list when no room
+        has space
+        :param person:
+        :param pool:
+        :param waiting_list:
+        :return: room or False
+        """
+        with pool.lock:
+            room = pool.pick()
+            if not room:
+                self.join_waiting_list(person, waiting_list)
+                return False
+            self.add_person_to_room(person, room)
+            if isinstance(room, Office):
+                person.office = room
+            else:
+                person.living_place = room
+            return room
+
+    def waiting_lists(self):
+        """
+        :return: the waiting lists, in the order journals and
+                 snapshots number them
+        """
+        return (self.fellows_not_allocated_office,
+                self.fellows_not_allocated_living_space,
+                self.staff_not_allocated)
+
+    def join_waiting_list(self, person, waiting_list):
+        """
+        Puts person at the end of a waiting list. Joins are journaled
+        so replays give back the same waiting order
+        :param person:
+        :param waiting_list:
+        :return:
+        """
+        if person not in waiting_list:
+            waiting_list.append(person)
+            if self.journal:
+                self.journal.wait(person, self.waiting_lists().index(waiting_list))
 
     def add_person_to_room(self, person, room):
         """
-        Adds a person to a room
+        Adds a person to a room. The capacity check and the
+        append happen together under the lock of the room's pool
         :param person: 
         :param room: 
-        :return: 
+        :return: False if the room was already full
         """
-        room.occupants.append(person)
-        room.spaces -= 1
+        pool = self.get_free_pool(room)
+        with pool.lock:
+            if not room.contains_space():
+                return False
+            room.occupants.append(person)
+            room.spaces -= 1
+            if room.contains_space():
+                pool.update(room)
+            else:
+                pool.discard(room)
+            self.mark_dirty(room)
+            self.mark_dirty(person)
+            if self.journal:
+                self.journal.enter(person, room)
+            return True
+
+    def remove_person_from_room(self, person, room):
+        """
+        Removes a person from a room, freeing up their space
+        :param person:
+        :param room:
+        :return:
+        """
+        pool = self.get_free_pool(room)
+        with pool.lock:
+            room.occupants.remove(person)
+            room.spaces += 1
+            pool.add(room)
+            self.mark_dirty(room)
+            self.mark_dirty(person)
+            if self.journal:
+                self.journal.leave(person, room)
 
     def get_available_living_spaces(self) -> Union[bool, LivingSpace]:
         """
-        Check if living space still has available space
+        Picks a random living space that still has available space
         :return: 
         """
-        shuffle(self.all_living_spaces)
-        for living_space in self.all_living_spaces:
-            if living_space.contains_space():
-                return living_space
-        return False
+        return self.free_living_spaces.pick() or False
 
     def print_room(self, room_name):
         """Print names of people in room 
@@ -201,93 +569,145 @@ class Dojo:
             return 'Room name can not be empty'
 
         else:
-            rooms = self.all_offices + self.all_living_spaces
-            for room in rooms:
-                if room.name == room_name:
-                    click.secho('-------------' + room_name +
-                                '-------------', fg='cyan', bold=True)
-                    if not room.occupants:
-                        click.secho('Room is currently empty', fg='red', bold=True)
-                        return None
-                    else:
-                        for person in room.occupants:
-                            click.secho(person.name, fg='green', bold=True)
-                        return None
+            room = self.get_room(room_name)
+            if room:
+                with self.get_free_pool(room).lock:
+                    occupants = list(room.occupants)
+                click.secho('-------------' + room_name +
+                            '-------------', fg='cyan', bold=True)
+                if not occupants:
+                    click.secho('Room is currently empty', fg='red', bold=True)
+                    return None
+                else:
+                    for person in occupants:
+                        click.secho(person.name, fg='green', bold=True)
+                    return None
             print('Room ' + room_name + ' does not exist')
 
     def print_allocations(self):
         """Print space allocations to screen"""
-        text = self.allocations_text()
-        if not text:
+        if not self.print_report(self.iter_allocations_text()):
             click.secho('No persons are currently allocated rooms',
                         fg='red', bold=True)
-        else:
-            click.secho(text, fg='cyan', bold=True)
 
     def print_allocations_to_file(self, filename):
         """Print space allocations to file"""
         filename = '../files/' + filename
-        file = open(filename, 'w')
-        text = self.allocations_text()
-        file.write(text)
-        file.close()
+        with open(filename, 'w') as file:
+            file.writelines(self.iter_allocations_text())
 
     def allocations_text(self):
         """
         generates text of all room allocations
         :return: 
         """
-        rooms = self.all_offices + self.all_living_spaces
-        text = ''
+        return ''.join(self.iter_allocations_text())
+
+    def iter_allocations_text(self):
+        """
+        Lazily generates the allocations report one room at a time
+        :return: generator of text chunks
+        """
+        for rooms, room_type in ((self.all_offices, 'Office '),
+                                 (self.all_living_spaces, 'Living Space ')):
+            for room, occupants in self.room_occupants(rooms):
+                yield (room_type + room.name.upper() + '\n'
+                       '---------------------------------------------\n' +
+                       ''.join([person.name + '(' + person.__str__() + '), '
+                                for person in occupants]) +
+                       '\n\n\n')
+
+    def room_occupants(self, rooms):
+        """
+        Lazily copies the occupants of rooms one room at a time,
+        each under the lock of its pool, so reports can be read
+        while other threads add and move people
+        :param rooms: all_offices or all_living_spaces
+        :return: generator of (room, list of occupants)
+        """
+        with self.registry_lock:
+            rooms = list(rooms)
         for room in rooms:
-            if isinstance(room, Office):
-                room_type = 'Office '
-            else:
-                room_type = 'Living Space '
+            with self.get_free_pool(room).lock:
+                occupants = list(room.occupants)
+            yield room, occupants
 
-            text += room_type + room.name.upper() + '\n'
-            text += '---------------------------------------------\n'
-            occupants_list = room.occupants
-            for person in occupants_list:
-                text += person.name + '(' + person.__str__() + ')' + ', '
-            text += '\n\n\n'
-        return text
+    def waiting_people(self):
+        """
+        Copies the waiting lists under the locks of their pools
+        :return: (fellows waiting for an office, fellows waiting for
+                 a living space, staff waiting for an office)
+        """
+        with self.free_offices.lock:
+            fellows_waiting_office = list(self.fellows_not_allocated_office)
+            staff_waiting = list(self.staff_not_allocated)
+        with self.free_living_spaces.lock:
+            fellows_waiting_living_space = list(self.fellows_not_allocated_living_space)
+        return fellows_waiting_office, fellows_waiting_living_space, staff_waiting
 
     def print_un_allocations(self):
         """Print spaces not allocated to screen"""
-        text = self.un_allocations_text()
-        if not text:
+        if not self.print_report(self.iter_un_allocations_text()):
             click.secho('No persons are currently not allocated rooms',
                         fg='red', bold=True)
-        else:
-            click.secho(text, fg='cyan', bold=True)
 
     def un_allocations_text(self):
         """
         geaerates text of people not allocated room space
         :return: 
         """
-        text = ''
-        for fellow in self.fellows_not_allocated_office:
-            text += fellow.name.upper() + ', Fellow Unallocated Office\n'
+        return ''.join(self.iter_un_allocations_text())
 
-        for fellow in self.fellows_not_allocated_living_space:
-            text += fellow.name.upper() + ', Fellow Unallocated living space\n'
+    def iter_un_allocations_text(self):
+        """
+        Lazily generates the unallocated report one line at a time
+        :return: generator of text lines
+        """
+        fellows_waiting_office, fellows_waiting_living_space, staff_waiting = \
+            self.waiting_people()
+        for fellow in fellows_waiting_office:
+            yield fellow.name.upper() + ', Fellow Unallocated Office\n'
 
-        for fellow in self.staff_not_allocated:
-            text += fellow.name.upper() + ', Staff Unallocated Office\n'
+        for fellow in fellows_waiting_living_space:
+            yield fellow.name.upper() + ', Fellow Unallocated living space\n'
 
-        return text
+        for fellow in staff_waiting:
+            yield fellow.name.upper() + ', Staff Unallocated Office\n'
 
     def print_un_allocations_to_file(self, filename):
         """Print spaces not allocated to file"""
         filename = '../files/' + filename
+        with open(filename, 'w') as file:
+            file.writelines(self.iter_un_allocations_text())
 
-        file = open(filename, 'w')
-        text = self.un_allocations_text()
-        file.write(text)
-        file.close()
-
+    @staticmethod
+    def print_report(chunks, chunk_size=REPORT_CHUNK_SIZE):
+        """
+        Streams report text to the screen, grouping small
+        chunks so the terminal is written to in large blocks
+        :param chunks: iterable of text
+        :param chunk_size: number of characters per write
+        :return boolean: False if the report was empty
+        """
+        printed = False
+        block = []
+        length = 0
+        for chunk in chunks:
+            block.append(chunk)
+            length += len(chunk)
+            if length >= chunk_size:
+                click.secho(''.join(block), fg='cyan', bold=True, nl=False)
+                printed = True
+                block = []
+                length = 0
+        if block:
+            click.secho(''.join(block), fg='cyan', bold=True, nl=False)
+            printed = True
+        if printed:
+            click.echo()
+        return printed
+
+    @checkpointed
     def re_allocate_person(self, person_name, room_name):
         """
         Reallocates person from current room to new room
@@ -297,46 +717,60 @@ class Dojo:
         """
         room = self.get_room(room_name)
         if room:
-            if not room.contains_space():
-                click.secho('%s is already full' % room_name, fg='red', bold=True)
-                return 'Room already full'
-
-            person = self.get_person(person_name)
-            if person:
-                if isinstance(room, Office):
-                    if person.office == room:
-                        click.secho('%s is already in room %s'
-                                    % (person_name, room_name), fg='red', bold=True)
-                        return '%s is already in room %s' % (person_name, room_name)
-                    self.re_allocate_to_office(person, room)
-                    click.secho('%s has been reallocated to office %s'
-                                % (person_name, room_name), fg='cyan', bold=True)
-                    return '%s has been reallocated to Office %s' % (person_name, room_name)
-
-                elif isinstance(room, LivingSpace):
-                    if isinstance(person, Fellow):
-                        if person.living_place == room:
-                            return person_name + \
-                                   ' is already in room ' + room_name
-                        if self.re_allocate_to_living_space(person, room):
-                            click.secho('%s has been reallocated to Living Space %s'
-                                        % (person_name, room_name), fg='cyan', bold=True)
-                            return '%s has been reallocated to Living Space %s' \
-                                   % (person_name, room_name)
+            # the capacity check and the move must not interleave with
+            # other threads filling the same pool
+            with self.get_free_pool(room).lock:
+                if not room.contains_space():
+                    self.reporter.emit('room_full', 'error', '%(room)s is already full',
+                                       room=room_name)
+                    return 'Room already full'
+
+                person = self.get_person(person_name)
+                if person:
+                    if isinstance(room, Office):
+                        if person.office == room:
+                            self.reporter.emit('already_in_room', 'error',
+                                               '%(name)s is already in room %(room)s',
+                                               name=person_name, room=room_name)
+                            return '%s is already in room %s' % (person_name, room_name)
+                        self.re_allocate_to_office(person, room)
+                        self.reporter.emit('reallocated_office', 'info',
+                                           '%(name)s has been reallocated to office %(room)s',
+                                           name=person_name, room=room_name)
+                        return '%s has been reallocated to Office %s' \
+                               % (person_name, room_name)
+
+                    elif isinstance(room, LivingSpace):
+                        if isinstance(person, Fellow):
+                            if person.living_place == room:
+                                return person_name + \
+                                       ' is already in room ' + room_name
+                            if self.re_allocate_to_living_space(person, room):
+                                self.reporter.emit('reallocated_living_space', 'info',
+                                                   '%(name)s has been reallocated to '
+                                                   'Living Space %(room)s',
+                                                   name=person_name, room=room_name)
+                                return '%s has been reallocated to Living Space %s' \
+                                       % (person_name, room_name)
+                            else:
+                                self.reporter.emit('accommodation_not_wanted', 'error',
+                                                   '-----------%(name)s does not want '
+                                                   'accommodation----------',
+                                                   name=person.name)
+                                return '%s does not want accommodation' % person.name
                         else:
-                            click.secho('-----------%s does not want accommodation----------'
-                                        % person.name, fg='red', bold=True)
-                            return '%s does not want accommodation' % person.name
-                    else:
-                        click.secho('Cant Re-allocate staff to a living space',
-                                    fg='red', bold=True)
-                        return 'Cant Re-allocate staff to a living space'
-            else:
-                click.secho('Person with name %s does not exist'
-                            % person_name, fg='red', bold=True)
-                return 'Person with name ' + person_name + ' does not exist'
+                            self.reporter.emit('staff_to_living_space', 'error',
+                                               'Cant Re-allocate staff to a living space',
+                                               name=person_name, room=room_name)
+                            return 'Cant Re-allocate staff to a living space'
+                else:
+                    self.reporter.emit('person_not_found', 'error',
+                                       'Person with name %(name)s does not exist',
+                                       name=person_name)
+                    return 'Person with name ' + person_name + ' does not exist'
         else:
-            click.secho('Room with name %s does not exist' % room_name)
+            self.reporter.emit('room_not_found', 'error',
+                               'Room with name %(room)s does not exist', room=room_name)
             return 'Room with name ' + room_name + ' does not exist'
 
     def re_allocate_to_office(self, person, room):
@@ -347,18 +781,16 @@ class Dojo:
         :return: 
         """
 
-        persons_not_allocated = \
-            self.fellows_not_allocated_office + self.staff_not_allocated
-        if person not in persons_not_allocated:
-            person.office.occupants.remove(person)
-            person.office.spaces -= 1
+        if (person not in self.fellows_not_allocated_office and
+                person not in self.staff_not_allocated):
+            self.remove_person_from_room(person, person.office)
         else:
             if isinstance(person, Fellow):
                 self.fellows_not_allocated_office.remove(person)
             else:
                 self.staff_not_allocated.remove(person)
 
-        room.occupants.append(person)
+        self.add_person_to_room(person, room)
         person.office = room
 
     def re_allocate_to_living_space(self, person, room):
@@ -368,16 +800,183 @@ class Dojo:
         :param room: 
         :return: 
         """
-        if person.wants_accomodation == 'N':
+        if not person.wants_accomodation:
             return False
         if person not in self.fellows_not_allocated_living_space:
-            person.living_place.occupants.remove(person)
-            person.living_place.spaces -= 1
+            self.remove_person_from_room(person, person.living_place)
         else:
             self.fellows_not_allocated_living_space.remove(person)
 
-        room.occupants.append(person)
-        person.office = room
+        self.add_person_to_room(person, room)
+        person.living_place = room
+        return True
+
+    @checkpointed
+    @exclusive
+    def reallocate_many(self, moves):
+        """
+        Reallocates several people at once. Every move is checked
+        against the state the earlier moves leave behind and nothing
+        is applied unless all of them are valid
+        :param moves: iterable of (person_name, room_name)
+        :return ReallocationResult:
+        """
+        result = ReallocationResult()
+        planned = []
+        # room -> spaces and (person, attribute) -> room after the moves so far
+        spaces = {}
+        placements = {}
+
+        for index, (person_name, room_name) in enumerate(moves):
+            room = self.get_room(room_name)
+            person = self.get_person(person_name)
+            if not room:
+                result.errors.append((index, 'Room with name %s does not exist' % room_name))
+                continue
+            if not person:
+                result.errors.append((index, 'Person with name %s does not exist'
+                                      % person_name))
+                continue
+
+            if isinstance(room, Office):
+                attribute = 'office'
+            elif not isinstance(person, Fellow):
+                result.errors.append((index, 'Cant Re-allocate staff to a living space'))
+                continue
+            elif not person.wants_accomodation:
+                result.errors.append((index, '%s does not want accommodation' % person_name))
+                continue
+            else:
+                attribute = 'living_place'
+
+            current = placements.get((person, attribute), getattr(person, attribute))
+            if current is room:
+                result.errors.append((index, '%s is already in room %s'
+                                      % (person_name, room_name)))
+                continue
+            if spaces.get(room, room.spaces) <= 0:
+                result.errors.append((index, '%s is already full' % room_name))
+                continue
+
+            spaces[room] = spaces.get(room, room.spaces) - 1
+            if current:
+                spaces[current] = spaces.get(current, current.spaces) + 1
+            placements[(person, attribute)] = room
+            planned.append((person, room))
+
+        if result.errors:
+            self.reporter.emit('reallocation_rejected', 'error',
+                               '%(errors)d of %(moves)d moves are invalid, '
+                               'nobody has been reallocated',
+                               errors=len(result.errors),
+                               moves=len(planned) + len(result.errors))
+            return result
+
+        for person, room in planned:
+            if isinstance(room, Office):
+                self.re_allocate_to_office(person, room)
+            else:
+                self.re_allocate_to_living_space(person, room)
+            result.moved.append((person, room))
+        self.reporter.emit('reallocated_many', 'info',
+                           '%(moves)d people have been reallocated', moves=len(planned))
+        return result
+
+    def load_moves(self, file_path):
+        """
+        Reallocates people listed in a text file, one
+        FIRST LAST ROOM move per line, all or nothing
+        :param file_path:
+        :return ReallocationResult:
+        """
+        try:
+            fp = open(file_path)
+        except FileNotFoundError:
+            print('File path ' + file_path + ' not found')
+            return None
+
+        moves = []
+        line_numbers = []
+        with fp:
+            for line_number, line in enumerate(fp, 1):
+                words = line.split()
+                if not words:
+                    continue
+                if len(words) != 3:
+                    result = ReallocationResult()
+                    result.errors.append((line_number, 'expected FIRST LAST ROOM'))
+                    self.report_move_errors(result)
+                    return result
+                moves.append((words[0] + ' ' + words[1], words[2]))
+                line_numbers.append(line_number)
+
+        result = self.reallocate_many(moves)
+        result.errors = [(line_numbers[index], message) for index, message in result.errors]
+        self.report_move_errors(result)
+        return result
+
+    def report_move_errors(self, result):
+        """
+        Reports every invalid line of a moves file
+        :param result:
+        :return:
+        """
+        for line_number, message in result.errors:
+            self.reporter.emit('move_rejected', 'error', 'line %(line)d: %(reason)s',
+                               line=line_number, reason=message)
+
+    @checkpointed
+    @exclusive
+    def fill_from_waiting_lists(self, policy='fifo'):
+        """
+        Moves waiting people into free spaces, one batch per room type
+        :param policy: 'fifo' places the people who have waited longest,
+                       'random' picks waiting people at random
+        :return: (people given offices, people given living spaces)
+        """
+        if policy is True:
+            policy = 'fifo'
+        if policy not in BACKFILL_POLICIES:
+            raise ValueError('Backfill policy should be one of %s'
+                             % ', '.join(BACKFILL_POLICIES))
+        placed = []
+        for pool, waiting_lists, attribute in (
+                (self.free_offices,
+                 (self.fellows_not_allocated_office, self.staff_not_allocated),
+                 'office'),
+                (self.free_living_spaces,
+                 (self.fellows_not_allocated_living_space,),
+                 'living_place')):
+            free_spaces = pool.free_spaces()
+            if policy == 'fifo':
+                waiting = oldest_waiting(waiting_lists, free_spaces)
+            else:
+                waiting = [(person, waiting_list) for waiting_list in waiting_lists
+                           for person in waiting_list]
+                waiting = sample(waiting, min(free_spaces, len(waiting)))
+            people = [person for person, _ in waiting]
+            moved = 0
+            for (person, waiting_list), (_, room) in zip(waiting,
+                                                          self.deal_rooms(people, pool)):
+                # rooms filled behind the pool's back can leave fewer spaces
+                if room is None:
+                    break
+                waiting_list.remove(person)
+                self.add_person_to_room(person, room)
+                setattr(person, attribute, room)
+                moved += 1
+            placed.append(moved)
+
+        if any(placed):
+            self.reporter.emit('waiting_lists_filled', 'info',
+                               '----------------%(offices)d people moved into offices, '
+                               '%(living_spaces)d into living spaces from the '
+                               'waiting lists (%(policy)s)',
+                               offices=placed[0], living_spaces=placed[1], policy=policy,
+                               still_waiting=len(self.fellows_not_allocated_office) +
+                               len(self.staff_not_allocated) +
+                               len(self.fellows_not_allocated_living_space))
+        return placed[0], placed[1]
 
     def get_person(self, name):
         """
@@ -385,11 +984,7 @@ class Dojo:
         :param name: 
         :return: 
         """
-        persons = self.all_fellows + self.all_staff
-        for person in persons:
-            if person.name == name:
-                return person
-        return False
+        return self.people.get(name, False)
 
     def get_room(self, room_name):
         """
@@ -397,130 +992,337 @@ class Dojo:
         :param room_name: 
         :return: 
         """
-        rooms = self.all_offices + self.all_living_spaces
-        for room in rooms:
-            if room.name == room_name:
-                return room
-        return False
+        return self.rooms.get(room_name, False)
 
-    def load_people(self, file_path):
-        """Loads people from text file"""
+    def load_people(self, file_path, chunk_size=1000, rejects_file=None,
+                    strategy='random'):
+        """
+        Loads people from text file.
+        The file is parsed lazily and allocated chunk_size people
+        at a time so memory use does not grow with the file size.
+        Malformed rows are skipped and recorded in the returned report
+        :param file_path:
+        :param chunk_size:
+        :param rejects_file: optional file object every rejected row is written to
+        :param strategy: allocation strategy passed on to allocate_batch
+        :return LoadReport:
+        """
+        report = LoadReport(rejects_file=rejects_file)
         try:
             fp = open(file_path)
         except FileNotFoundError:
             print('File path ' + file_path + ' not found')
-        else:
-            for line in fp:
-                words = line.split()
-                name = words[0] + ' ' + words[1]
-                if words[2] == 'FELLOW':
-                    if words[3] == 'Y':
-                        self.add_fellow(name, 'Y')
-                    else:
-                        self.add_fellow(name)
-                elif words[2] == 'STAFF':
-                    self.add_staff(name)
-
+            return None
+
+        with fp:
+            for people in chunked(parse_roster(fp, report), chunk_size):
+                self.allocate_batch(people, strategy)
+                report.loaded += len(people)
+                report.chunks += 1
+
+        self.reporter.emit('people_loaded', 'info',
+                           '----------------Loaded %(loaded)d people from %(lines)d lines',
+                           loaded=report.loaded, lines=report.lines_read,
+                           rejected=report.rejected)
+        for line_number, line, reason in report.rejects:
+            self.reporter.emit('row_rejected', 'warning',
+                               'line %(line_number)d rejected: %(line)s (%(reason)s)',
+                               line_number=line_number, line=line, reason=reason)
+        return report
+
+    @exclusive
     def save_state(self, db=None):
         """
-        Persist the current data to the Database
-        :param db: 
+        Persist the current data to the Database.
+        The first save to a database replaces all of its rows, after that
+        only rooms and people changed since the last save are written.
+        Everything happens in a single transaction using executemany.
+        SQLAlchemy is only imported once state is saved or loaded
+        :param db: database file or URL, see modals.table_def.database_url
         :return: 
         """
-        if os.path.exists('Dojo.db'):
-            os.remove('Dojo.db')
-        if db:
-            db = db + '.db'
-            engine = create_engine('sqlite:///..\modals\\' + db, echo=True)
-
-        # create a Session
-        Session = sessionmaker(bind=engine)
-        session = Session()
-
-        # Save offices to db
-        for office in self.all_offices:
-            office_modal = OfficeModel(office.name, office.spaces)
-            session.add(office_modal)
-
-        # Save living spaces to db
-        for living_space in self.all_living_spaces:
-            living_space_modal = LivingSpaceModel(living_space.name, living_space.spaces)
-            session.add(living_space_modal)
-
-        # Save staff spaces to db
-        for staff in self.all_staff:
-            staff_modal = StaffModel(staff.name, staff.office.name)
-            session.add(staff_modal)
+        from sqlalchemy import delete
+        from modals.table_def import OfficeModel, FellowModel, StaffModel, LivingSpaceModel
+        from modals.table_def import get_engine
 
-        # Save fellow to db
-        for fellow in self.all_fellows:
-            fellow_modal = FellowModel(fellow.name, fellow.office.name,
-                                       fellow.living_place.name, fellow.wants_accomodation)
-            session.add(fellow_modal)
+        engine = get_engine(db)
+        url = str(engine.url)
 
-        # commit the record the database
-        if session.commit():
-            click.secho('Current Application state saved to Database', fg='green', bold=True)
+        if self.saved_to != url:
+            self.forget_saved_ids()
+        try:
+            with engine.begin() as connection:
+                if self.saved_to != url:
+                    for model in (FellowModel, StaffModel, LivingSpaceModel, OfficeModel):
+                        connection.execute(delete(model))
+                self.write_dirty_objects(connection)
+        except Exception:
+            # ids handed out inside the failed transaction are not in the
+            # database, start over with a full save next time
+            self.saved_to = None
+            self.forget_saved_ids()
+            raise
+
+        changes = len(self.dirty_objects)
+        self.dirty_objects = {}
+        self.saved_to = url
+
+        self.reporter.emit('state_saved', 'success',
+                           'Current Application state saved to Database',
+                           changes=changes)
+
+    def write_dirty_objects(self, connection):
+        """
+        Inserts new and updates changed rooms and people.
+        Rooms are written first so people can reference their ids
+        :param connection:
+        :return:
+        """
+        from sqlalchemy import bindparam, func, insert, select, update
+        from modals.table_def import OfficeModel, FellowModel, StaffModel, LivingSpaceModel
+
+        changed = {}
+        for obj in self.dirty_objects:
+            changed.setdefault(self.state_table(obj), []).append(obj)
+
+        for model in (OfficeModel, LivingSpaceModel, StaffModel, FellowModel):
+            primary_key = list(model.__table__.primary_key)[0]
+            inserts = []
+            updates = []
+            last_id = None
+            for obj in changed.get(model.__tablename__, []):
+                row = self.state_row(obj)
+                if obj.db_id is None:
+                    if last_id is None:
+                        last_id = connection.execute(
+                            select(func.max(primary_key))).scalar() or 0
+                    last_id += 1
+                    obj.db_id = last_id
+                    row[primary_key.key] = last_id
+                    inserts.append(row)
+                else:
+                    row['row_id'] = obj.db_id
+                    updates.append(row)
+            if inserts:
+                connection.execute(insert(model), inserts)
+            if updates:
+                connection.execute(update(model).where(primary_key == bindparam('row_id')),
+                                   updates)
+
+    @staticmethod
+    def state_table(obj):
+        """
+        Gets the name of the table a room or person is saved in
+        :param obj:
+        :return:
+        """
+        if isinstance(obj, Office):
+            return 'office'
+        if isinstance(obj, LivingSpace):
+            return 'living_space'
+        if isinstance(obj, Staff):
+            return 'staff'
+        return 'fellow'
+
+    def state_row(self, obj):
+        """
+        Gets the database row for a room or person
+        :param obj:
+        :return: dict of column values
+        """
+        if isinstance(obj, (Office, LivingSpace)):
+            return {'name': obj.name, 'spaces': obj.spaces}
+        if isinstance(obj, Staff):
+            return {'name': obj.name, 'office_id': self.room_id(obj.office)}
+        return {'name': obj.name,
+                'office_id': self.room_id(obj.office),
+                'living_space_id': self.room_id(obj.living_place),
+                'wants_accomodation': 'Y' if obj.wants_accomodation else 'N'}
+
+    def forget_saved_ids(self):
+        """
+        Drops the database ids of all rooms and people and
+        marks them all as changed, so the next save writes everything
+        :return:
+        """
+        self.dirty_objects = {}
+        for obj in (self.all_offices + self.all_living_spaces +
+                    self.all_staff + self.all_fellows):
+            obj.db_id = None
+            self.mark_dirty(obj)
+
+    @staticmethod
+    def room_id(room):
+        """
+        Gets the database id of a room a person is in
+        :param room: room or None
+        :return: 
+        """
+        return room.db_id if room else None
 
+    @exclusive
     def load_state(self, db=None):
         """
-        Load data from the database into program memory
-        :param db: 
+        Load data from the database into program memory.
+        Rooms are loaded into id -> room maps first, then people are
+        streamed in batches and joined to their rooms through the maps
+        :param db: database file or URL, see modals.table_def.database_url
         :return: 
         """
-        # if db is None:
-        #     engine = create_engine('sqlite:///..\modals\Dojo.db', echo=True)
-        # else:
-        #     db = db + '.db'
-        #     engine = create_engine('sqlite:///..\modals\\' + db, echo=True)
+        from sqlalchemy.orm import sessionmaker
+        from modals.table_def import OfficeModel, FellowModel, StaffModel, LivingSpaceModel
+        from modals.table_def import get_engine
+
+        engine = get_engine(db)
+        url = str(engine.url)
+        if self.saved_to != url:
+            self.forget_saved_ids()
 
         # create a Session
         Session = sessionmaker(bind=engine)
         session = Session()
 
-        # Loads offices from the databe
-        for office in session.query(OfficeModel).order_by(OfficeModel.office_id):
-            new_office = Office(office.name)
-            new_office.spaces = office.spaces
-            self.all_offices.append(new_office)
+        # Loads offices from the database
+        offices = {}
+        for office_id, name, spaces in session.query(
+                OfficeModel.office_id, OfficeModel.name, OfficeModel.spaces
+        ).order_by(OfficeModel.office_id).yield_per(LOAD_BATCH_SIZE):
+            new_office = Office(name)
+            new_office.spaces = spaces
+            new_office.db_id = office_id
+            self.register_room(new_office)
+            offices[office_id] = new_office
 
         # Loads living spaces from the database
-        for living_space in session.query(LivingSpaceModel).order_by(LivingSpaceModel.id):
-            new_living_space = LivingSpace(living_space.name)
-            new_living_space.spaces = living_space.spaces
-            self.all_living_spaces.append(new_living_space)
+        living_spaces = {}
+        for living_space_id, name, spaces in session.query(
+                LivingSpaceModel.id, LivingSpaceModel.name, LivingSpaceModel.spaces
+        ).order_by(LivingSpaceModel.id).yield_per(LOAD_BATCH_SIZE):
+            new_living_space = LivingSpace(name)
+            new_living_space.spaces = spaces
+            new_living_space.db_id = living_space_id
+            self.register_room(new_living_space)
+            living_spaces[living_space_id] = new_living_space
 
         # Loads staff from the database
-        for staff in session.query(StaffModel).order_by(StaffModel.id):
-            # Create new Staff Object from DB staff name
-            new_staff = Staff(staff.name)
-
-            for office in self.all_offices:
-                if office.name == staff.office:
-                    # assign office to the staff
-                    new_staff.office = office
-                    office.occupants.append(new_staff)
-                    break
-            # Append new office to list of office objects
-            self.all_staff.append(new_staff)
+        for staff_id, name, office_id in session.query(
+                StaffModel.id, StaffModel.name, StaffModel.office_id
+        ).order_by(StaffModel.id).yield_per(LOAD_BATCH_SIZE):
+            new_staff = Staff(name)
+            new_staff.db_id = staff_id
+            office = offices.get(office_id)
+            if office:
+                new_staff.office = office
+                office.occupants.append(new_staff)
+            else:
+                self.staff_not_allocated.append(new_staff)
+            self.register_person(new_staff)
 
         # Loads fellows from the database
-        for fellow in session.query(FellowModel).order_by(FellowModel.id):
-            # Create new fellow Object from database details
-            new_fellow = Fellow(fellow.name, fellow.wants_accomodation)
-            for office in self.all_offices:
-                if office.name == fellow.office:
-                    # assign office to the staff
-                    new_fellow.office = office
-                    office.occupants.append(new_fellow)
-                    break
-            self.all_fellows.append(new_fellow)
+        for fellow_id, name, office_id, living_space_id, wants_accomodation in session.query(
+                FellowModel.id, FellowModel.name, FellowModel.office_id,
+                FellowModel.living_space_id, FellowModel.wants_accomodation
+        ).order_by(FellowModel.id).yield_per(LOAD_BATCH_SIZE):
+            new_fellow = Fellow(name, wants_accomodation)
+            new_fellow.db_id = fellow_id
+            office = offices.get(office_id)
+            if office:
+                new_fellow.office = office
+                office.occupants.append(new_fellow)
+            else:
+                self.fellows_not_allocated_office.append(new_fellow)
+
+            living_space = living_spaces.get(living_space_id)
+            if living_space:
+                new_fellow.living_place = living_space
+                living_space.occupants.append(new_fellow)
+            elif new_fellow.wants_accomodation:
+                self.fellows_not_allocated_living_space.append(new_fellow)
+            self.register_person(new_fellow)
+        session.close()
+
+        # Everything loaded matches the database, only rooms and people
+        # that existed before loading still need saving
+        for obj in list(self.dirty_objects):
+            if obj.db_id is not None:
+                del self.dirty_objects[obj]
+        self.saved_to = url
+        # people loaded here went straight into their rooms without
+        # being journaled, a snapshot captures them
+        if self.journal:
+            self.journal.compact(self)
+
+    @exclusive
+    def save_snapshot(self, path):
+        """
+        Writes the current state to a binary snapshot file,
+        much faster than save_state for big campuses
+        :param path:
+        :return: size of the snapshot in bytes
+        """
+        size = write_snapshot(self, path)
+        self.reporter.emit('snapshot_saved', 'success',
+                           'Current Application state saved to %(path)s',
+                           path=path, size=size)
+        return size
+
+    @exclusive
+    def load_snapshot(self, path):
+        """
+        Loads rooms and people from a binary snapshot file
+        :param path:
+        :return: (rooms loaded, people loaded), None if there is no such file
+        """
+        try:
+            rooms, people = load_snapshot(self, path)
+        except FileNotFoundError:
+            self.reporter.emit('snapshot_not_found', 'error',
+                               'Snapshot %(path)s does not exist', path=path)
+            return None
+        self.reporter.emit('snapshot_loaded', 'success',
+                           '%(rooms)d rooms and %(people)d people loaded from %(path)s',
+                           rooms=rooms, people=people, path=path)
+        if self.journal:
+            self.journal.compact(self)
+        return rooms, people
+
+    def open_journal(self, path, sync_every=64, compact_every=100000):
+        """
+        Replays the journal at path, if there is one, and from then on
+        appends every room and person created and every move to it.
+        Replay starts from the last snapshot, so it only reads the
+        records written since the last compaction
+        :param path:
+        :param sync_every: records written between fsyncs
+        :param compact_every: records written between compactions
+        :return: number of records replayed
+        """
+        had_state = bool(self.rooms or self.people)
+        journal = Journal(path, sync_every, compact_every)
+        replayed = journal.replay(self)
+        self.journal = journal
+        if had_state:
+            # what was there before the journal was opened is not in it
+            self.compact_journal()
+        self.reporter.emit('journal_opened', 'info',
+                           '%(records)d journal records replayed from %(path)s',
+                           records=replayed, path=path)
+        return replayed
+
+    @exclusive
+    def compact_journal(self):
+        """
+        Folds the journal into a snapshot of the current state
+        :return:
+        """
+        if self.journal:
+            self.journal.compact(self)
 
-            for l_space in self.all_living_spaces:
-                if l_space.name == fellow.living_space:
-                    # assign office to the staff
-                    new_fellow.living_place = l_space
-                    l_space.occupants.append(new_fellow)
-                    break
-            # Append new living_space to list of living_space objects
-            self.all_fellows.append(new_fellow)
+    def close_journal(self):
+        """
+        Syncs and closes the journal, changes are no longer journaled
+        :return:
+        """
+        if self.journal:
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,128 @@
+"""
+Machine readable exports of the Dojo allocations.
+Records are streamed straight from the in memory state to any path,
+gzip compressed when asked to or when the path ends in .gz
+"""
+import csv
+import gzip
+import json
+
+EXPORT_FORMATS = ('text', 'csv', 'jsonl', 'columnar')
+ALLOCATION_FIELDS = ('room', 'room_type', 'person', 'person_type')
+UNALLOCATED_FIELDS = ('person', 'person_type', 'unallocated')
+
+
+def open_output(path, compress=False):
+    """
+    Opens path for writing text
+    :param path:
+    :param compress: gzip the output, implied by a .gz suffix
+    :return: file object
+    """
+    if compress or path.endswith('.gz'):
+        return gzip.open(path, 'wt', newline='')
+    return open(path, 'w', newline='')
+
+
+def allocation_records(dojo):
+    """
+    One record per person in a room, offices first
+    :param dojo:
+    :return: generator of tuples in ALLOCATION_FIELDS order
+    """
+    for rooms, room_type in ((dojo.all_offices, 'office'),
+                             (dojo.all_living_spaces, 'living_space')):
+        for room, occupants in dojo.room_occupants(rooms):
+            for person in occupants:
+                yield room.name, room_type, person.name, str(person)
+
+
+def unallocated_records(dojo):
+    """
+    One record per person waiting for a room
+    :param dojo:
+    :return: generator of tuples in UNALLOCATED_FIELDS order
+    """
+    for people, room_type in zip(dojo.waiting_people(),
+                                 ('office', 'living_space', 'office')):
+        for person in people:
+            yield person.name, str(person), room_type
+
+
+def write_csv(records, fields, file):
+    writer = csv.writer(file)
+    writer.writerow(fields)
+    writer.writerows(records())
+
+
+def write_jsonl(records, fields, file):
+    for record in records():
+        file.write(json.dumps(dict(zip(fields, record))) + '\n')
+
+
+def write_columnar(records, fields, file):
+    """
+    Writes one JSON object holding a list per field.
+    The records are read in a single pass and split into columns,
+    so every column comes from the same state even while other
+    threads change the Dojo
+    """
+    columns = [[] for _ in fields]
+    appends = [column.append for column in columns]
+    for record in records():
+        for append, value in zip(appends, record):
+            append(value)
+    file.write('{"fields": %s, "columns": {' % json.dumps(list(fields)))
+    for index, (field, column) in enumerate(zip(fields, columns)):
+        if index:
+            file.write(', ')
+        file.write('%s: %s' % (json.dumps(field), json.dumps(column)))
+    file.write('}}\n')
+
+
+WRITERS = {
+    'csv': write_csv,
+    'jsonl': write_jsonl,
+    'columnar': write_columnar,
+}
+
+
+def check_format(export_format):
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError('Export format should be one of %s' % ', '.join(EXPORT_FORMATS))
+
+
+def export_allocations(dojo, path, export_format='csv', compress=False):
+    """
+    Exports room allocations to path
+    :param dojo:
+    :param path:
+    :param export_format: text, csv, jsonl or columnar
+    :param compress:
+    :return:
+    """
+    check_format(export_format)
+    with open_output(path, compress) as file:
+        if export_format == 'text':
+            file.writelines(dojo.iter_allocations_text())
+        else:
+            WRITERS[export_format](lambda: allocation_records(dojo),
+                                   ALLOCATION_FIELDS, file)
+
+
+def export_unallocated(dojo, path, export_format='csv', compress=False):
+    """
+    Exports people waiting for rooms to path
+    :param dojo:
+    :param path:
+    :param export_format: text, csv, jsonl or columnar
+    :param compress:
+    :return:
+    """
+    check_format(export_format)
+    with open_output(path, compress) as file:
+        if export_format == 'text':
+            file.writelines(dojo.iter_un_allocations_text())
+        else:
+            WRITERS[export_format](lambda: unallocated_records(dojo),
+                                   UNALLOCATED_FIELDS, file)
@@ -0,0 +1,310 @@
+"""
+Append-only journal of the changes made to a Dojo.
+Instead of rewriting the whole state, every room and person created
+and every move in or out of a room is appended as one line, so the
+cost of durability stays constant per operation. Allocation outcomes
+are recorded, not the requests, so replaying the journal gives back
+exactly the same rooms even though allocation is random.
+
+Records are JSON arrays that start with a sequence number:
+    [seq, "room", room_id, name, "office" | "living_space"]
+    [seq, "person", person_id, name, "FELLOW" | "STAFF", wants_accommodation]
+    [seq, "enter", person_id, room_id]
+    [seq, "leave", person_id, room_id]
+    [seq, "wait", person_id, waiting_list]
+
+waiting_list numbers the lists as Dojo.waiting_lists does. Entering a
+room takes a person off the waiting lists for that type of room, so
+replaying the joins in order gives back the order of the lists.
+
+Compaction writes the whole state as the same records to a snapshot
+file that starts with ["snapshot", seq] and then empties the journal.
+On startup the snapshot is replayed, then the journal records newer
+than it.
+"""
+import json
+import os
+from threading import RLock
+
+from classes.pool import oldest_waiting
+from classes.room import Office, LivingSpace, Fellow, Staff
+
+SNAPSHOT_SUFFIX = '.snapshot'
+# one shared encoder, json.dumps builds a new one when given options
+ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+class Journal:
+    """
+    Journal file of a Dojo. Every record is flushed to the operating
+    system as it is written, so a crashed process loses nothing.
+    fsync is batched, a power failure can lose the last sync_every
+    records at most
+    """
+
+    def __init__(self, path, sync_every=64, compact_every=100000):
+        """
+        :param path: journal file, the snapshot goes next to it
+        :param sync_every: records written between fsyncs
+        :param compact_every: records written between compactions
+        """
+        self.path = path
+        self.snapshot_path = path + SNAPSHOT_SUFFIX
+        self.sync_every = sync_every
+        self.compact_every = compact_every
+        self.ids = {}
+        self.seq = 0
+        self.unsynced = 0
+        self.since_compaction = 0
+        self.file = None
+        self.lock = RLock()
+
+    def id_of(self, obj):
+        """
+        Gets the journal id of a room or person, recording it
+        the first time it is seen
+        :param obj:
+        :return: id
+        """
+        obj_id = self.ids.get(obj)
+        if obj_id is None:
+            obj_id = self.ids[obj] = len(self.ids)
+            if isinstance(obj, Office):
+                self.write('room', obj_id, obj.name, 'office')
+            elif isinstance(obj, LivingSpace):
+                self.write('room', obj_id, obj.name, 'living_space')
+            elif isinstance(obj, Fellow):
+                self.write('person', obj_id, obj.name, 'FELLOW', obj.wants_accomodation)
+            else:
+                self.write('person', obj_id, obj.name, 'STAFF', False)
+        return obj_id
+
+    def record(self, obj):
+        """
+        Records a new room or person
+        :param obj:
+        :return:
+        """
+        with self.lock:
+            self.id_of(obj)
+
+    def enter(self, person, room):
+        with self.lock:
+            self.write('enter', self.id_of(person), self.id_of(room))
+
+    def leave(self, person, room):
+        with self.lock:
+            self.write('leave', self.id_of(person), self.id_of(room))
+
+    def wait(self, person, waiting_list):
+        """
+        Records person joining a waiting list
+        :param person:
+        :param waiting_list: number of the list in Dojo.waiting_lists
+        :return:
+        """
+        with self.lock:
+            self.write('wait', self.id_of(person), waiting_list)
+
+    def write(self, *record):
+        self.seq += 1
+        self.file.write(encode((self.seq,) + record))
+        self.file.flush()
+        self.unsynced += 1
+        self.since_compaction += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """
+        Forces the records written so far to disk
+        """
+        with self.lock:
+            if self.file and self.unsynced:
+                os.fsync(self.file.fileno())
+                self.unsynced = 0
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.sync()
+                self.file.close()
+                self.file = None
+
+    def due_for_compaction(self):
+        return self.since_compaction >= self.compact_every
+
+    def replay(self, dojo):
+        """
+        Rebuilds dojo from the snapshot and the journal, then opens
+        the journal for appending. A line torn by a crash at the end
+        of the journal is dropped
+        :param dojo: Dojo that is not journaling yet
+        :return: number of records replayed
+        """
+        objects = {}
+        replayed = 0
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as file:
+                snapshot_seq = json.loads(file.readline())[1]
+                for line in file:
+                    apply_record(dojo, json.loads(line), objects)
+                    replayed += 1
+        self.seq = snapshot_seq
+
+        good_bytes = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_bytes += len(line)
+                    # records already folded into the snapshot are skipped
+                    if record[0] > snapshot_seq:
+                        apply_record(dojo, record, objects)
+                        replayed += 1
+                        self.seq = record[0]
+                        self.since_compaction += 1
+
+        rebuild_waiting_lists(dojo)
+        self.ids = {obj: obj_id for obj_id, obj in objects.items()}
+        self.file = open(self.path, 'ab')
+        self.file.truncate(good_bytes)
+        return replayed
+
+    def compact(self, dojo):
+        """
+        Writes the whole state of dojo to the snapshot and empties the journal.
+        The snapshot replaces the old one atomically, and a crash before
+        the journal is emptied is harmless because replay skips records
+        the snapshot already holds
+        :param dojo:
+        :return:
+        """
+        with self.lock:
+            self.sync()
+            ids = {}
+            temporary_path = self.snapshot_path + '.tmp'
+            with open(temporary_path, 'wb') as file:
+                file.write(encode(('snapshot', self.seq)))
+                for obj in (dojo.all_offices + dojo.all_living_spaces +
+                            dojo.all_fellows + dojo.all_staff):
+                    ids[obj] = obj_id = len(ids)
+                    file.write(encode(object_record(obj, obj_id)))
+                for room in dojo.all_offices + dojo.all_living_spaces:
+                    for person in room.occupants:
+                        file.write(encode((0, 'enter', ids[person], ids[room])))
+                waiting_lists = dojo.waiting_lists()
+                for person, waiting_list in oldest_waiting(
+                        waiting_lists, sum(map(len, waiting_lists))):
+                    file.write(encode((0, 'wait', ids[person],
+                                       waiting_lists.index(waiting_list))))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, self.snapshot_path)
+            sync_directory(self.snapshot_path)
+
+            self.ids = ids
+            self.file.close()
+            self.file = open(self.path, 'wb')
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+            self.since_compaction = 0
+
+
+def encode(record):
+    return ENCODER.encode(record).encode() + b'\n'
+
+
+def object_record(obj, obj_id):
+    """
+    Snapshot record of a room or person
+    """
+    if isinstance(obj, Office):
+        return 0, 'room', obj_id, obj.name, 'office'
+    if isinstance(obj, LivingSpace):
+        return 0, 'room', obj_id, obj.name, 'living_space'
+    if isinstance(obj, Fellow):
+        return 0, 'person', obj_id, obj.name, 'FELLOW', obj.wants_accomodation
+    return 0, 'person', obj_id, obj.name, 'STAFF', False
+
+
+def apply_record(dojo, record, objects):
+    """
+    Replays one record against dojo
+    :param dojo:
+    :param record:
+    :param objects: journal id -> room or person, filled as records are replayed
+    :return:
+    """
+    kind = record[1]
+    if kind == 'room':
+        _, _, room_id, name, room_type = record
+        room = Office(name) if room_type == 'office' else LivingSpace(name)
+        dojo.register_room(room)
+        objects[room_id] = room
+    elif kind == 'person':
+        _, _, person_id, name, person_type, wants_accomodation = record
+        if person_type == 'FELLOW':
+            person = Fellow(name, wants_accomodation)
+        else:
+            person = Staff(name)
+        dojo.register_person(person)
+        objects[person_id] = person
+    elif kind == 'wait':
+        dojo.waiting_lists()[record[3]].append(objects[record[2]])
+    else:
+        person, room = objects[record[2]], objects[record[3]]
+        attribute = 'office' if isinstance(room, Office) else 'living_place'
+        if kind == 'enter':
+            if isinstance(room, Office):
+                dojo.fellows_not_allocated_office.discard(person)
+                dojo.staff_not_allocated.discard(person)
+            else:
+                dojo.fellows_not_allocated_living_space.discard(person)
+            dojo.add_person_to_room(person, room)
+            setattr(person, attribute, room)
+        else:
+            dojo.remove_person_from_room(person, room)
+            if getattr(person, attribute) is room:
+                setattr(person, attribute, None)
+
+
+def rebuild_waiting_lists(dojo):
+    """
+    Puts everyone the replay left without a room on the waiting lists.
+    People whose joins were replayed are already waiting and keep
+    their place
+    :param dojo:
+    :return:
+    """
+    for fellow in dojo.all_fellows:
+        if fellow.office is None:
+            dojo.fellows_not_allocated_office.append(fellow)
+        if fellow.wants_accomodation and fellow.living_place is None:
+            dojo.fellows_not_allocated_living_space.append(fellow)
+    for staff in dojo.all_staff:
+        if staff.office is None:
+            dojo.staff_not_allocated.append(staff)
+
+
+def sync_directory(path):
+    """
+    Makes a rename in the directory of path durable where the
+    platform allows opening directories
+    """
+    try:
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,224 @@
+"""
+Preference aware allocation as a capacity constrained min cost flow.
+
+Every person with preferences gets an edge to each room they listed,
+costing the rank of that room, and every room reaches the sink with its
+free spaces as capacity. A maximum flow of minimum cost places as many
+of these people in rooms they listed as possible and, among those
+placements, gives the best total preference rank.
+
+Everyone else, and the people none of whose rooms had space, are then
+dealt the spaces that are left at random, the same way rooms are dealt
+without preferences.
+
+Roommate groups can be expressed by giving the members of a group the
+same preference list.
+"""
+from bisect import bisect_right
+from heapq import heappop, heappush
+from itertools import accumulate
+from random import sample, shuffle
+
+INFINITY = float('inf')
+
+
+class MinCostFlow:
+    """
+    Primal-dual min cost flow. Dijkstra with potentials finds the
+    shortest path length, then a blocking flow pushes as much as
+    possible along every path of that length at once, so the number
+    of Dijkstra runs depends on the number of distinct path costs
+    rather than on the amount of flow
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.graph = [[] for _ in range(nodes)]
+        self.to = []
+        self.capacity = []
+        self.cost = []
+
+    def add_edge(self, source, target, capacity, cost):
+        """
+        Adds an edge and its residual twin
+        :return: index of the edge, its twin is index ^ 1
+        """
+        index = len(self.to)
+        self.graph[source].append(index)
+        self.to.append(target)
+        self.capacity.append(capacity)
+        self.cost.append(cost)
+        self.graph[target].append(index + 1)
+        self.to.append(source)
+        self.capacity.append(0)
+        self.cost.append(-cost)
+        return index
+
+    def flow(self, edge):
+        """
+        Gets the flow pushed through an edge
+        """
+        return self.capacity[edge ^ 1]
+
+    def solve(self, source, sink):
+        """
+        Pushes the maximum flow of minimum cost from source to sink
+        :return: (flow, cost)
+        """
+        potential = [0] * self.nodes
+        total_flow = 0
+        total_cost = 0
+        while True:
+            distance = self.shortest_paths(source, potential)
+            if distance[sink] == INFINITY:
+                return total_flow, total_cost
+            for node in range(self.nodes):
+                if distance[node] < INFINITY:
+                    potential[node] += distance[node]
+            pushed = self.blocking_flow(source, sink, potential)
+            total_flow += pushed
+            total_cost += pushed * (potential[sink] - potential[source])
+
+    def shortest_paths(self, source, potential):
+        """
+        Dijkstra over the residual graph using reduced costs
+        """
+        distance = [INFINITY] * self.nodes
+        distance[source] = 0
+        heap = [(0, source)]
+        to, capacity, cost, graph = self.to, self.capacity, self.cost, self.graph
+        while heap:
+            node_distance, node = heappop(heap)
+            if node_distance > distance[node]:
+                continue
+            base = node_distance + potential[node]
+            for edge in graph[node]:
+                if capacity[edge] > 0:
+                    target = to[edge]
+                    candidate = base + cost[edge] - potential[target]
+                    if candidate < distance[target]:
+                        distance[target] = candidate
+                        heappush(heap, (candidate, target))
+        return distance
+
+    def admissible(self, edge, node, potential):
+        return (self.capacity[edge] > 0 and
+                self.cost[edge] + potential[node] - potential[self.to[edge]] == 0)
+
+    def blocking_flow(self, source, sink, potential):
+        """
+        Dinic style maximum flow restricted to edges with zero reduced cost
+        :return: flow pushed
+        """
+        to, capacity, graph = self.to, self.capacity, self.graph
+        pushed = 0
+        while True:
+            level = [-1] * self.nodes
+            level[source] = 0
+            queue = [source]
+            for node in queue:
+                for edge in graph[node]:
+                    target = to[edge]
+                    if level[target] < 0 and self.admissible(edge, node, potential):
+                        level[target] = level[node] + 1
+                        queue.append(target)
+            if level[sink] < 0:
+                return pushed
+
+            next_edge = [0] * self.nodes
+            path = []
+            node = source
+            while True:
+                if node == sink:
+                    amount = min(capacity[edge] for edge in path)
+                    for edge in path:
+                        capacity[edge] -= amount
+                        capacity[edge ^ 1] += amount
+                    pushed += amount
+                    path = []
+                    node = source
+                    continue
+
+                edges = graph[node]
+                index = next_edge[node]
+                while index < len(edges):
+                    edge = edges[index]
+                    if (level[to[edge]] == level[node] + 1 and
+                            self.admissible(edge, node, potential)):
+                        break
+                    index += 1
+                next_edge[node] = index
+
+                if index < len(edges):
+                    path.append(edges[index])
+                    node = to[edges[index]]
+                elif node == source:
+                    break
+                else:
+                    # dead end, retreat and never come back here this phase
+                    level[node] = -1
+                    node = to[path.pop() ^ 1]
+                    next_edge[node] += 1
+
+
+def assign_with_preferences(people, rooms, preferences):
+    """
+    Assigns people to free spaces, honouring ranked room preferences
+    :param people: people to place
+    :param rooms: rooms with free spaces
+    :param preferences: dict of person -> list of rooms, best first
+    :return: list of (person, room) pairs, room is None when no space was left
+    """
+    rooms = [room for room in rooms if room.spaces > 0]
+    room_nodes = {room: 2 + index for index, room in enumerate(rooms)}
+    choosers = [person for person in people if preferences.get(person)]
+    others = [person for person in people if not preferences.get(person)]
+
+    source, sink = 0, 1
+    network = MinCostFlow(2 + len(rooms) + len(choosers))
+    room_edges = [network.add_edge(node, sink, room.spaces, 0)
+                  for room, node in room_nodes.items()]
+    choice_edges = []
+    for index, person in enumerate(choosers):
+        node = 2 + len(rooms) + index
+        network.add_edge(source, node, 1, 0)
+        choice_edges.append([(room, network.add_edge(node, room_nodes[room], 1, rank))
+                             for rank, room in enumerate(preferences[person])
+                             if room in room_nodes])
+
+    network.solve(source, sink)
+
+    assignment = []
+    missed = []
+    for person, edges in zip(choosers, choice_edges):
+        for room, edge in edges:
+            if network.flow(edge):
+                assignment.append((person, room))
+                break
+        else:
+            missed.append(person)
+
+    # choosers who missed all their rooms go first, then everyone else
+    # in random order, and the spaces left are sampled at random
+    shuffle(others)
+    waiting = missed + others
+    spaces = sample_spaces(rooms, [room.spaces - network.flow(edge)
+                                   for room, edge in zip(rooms, room_edges)],
+                           len(waiting))
+    assignment.extend(zip(waiting, spaces))
+    assignment.extend((person, None) for person in waiting[len(spaces):])
+    return assignment
+
+
+def sample_spaces(rooms, spaces, count):
+    """
+    Samples free spaces uniformly without replacement
+    :param rooms:
+    :param spaces: free spaces of each room
+    :param count: spaces wanted
+    :return: list of up to count rooms, one per space
+    """
+    ends = list(accumulate(spaces))
+    total = ends[-1] if ends else 0
+    return [rooms[bisect_right(ends, slot)]
+            for slot in sample(range(total), min(count, total))]
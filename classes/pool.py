@@ -0,0 +1,233 @@
+from contextlib import nullcontext
+from heapq import merge
+from itertools import count, islice
+from operator import itemgetter
+from random import choice, randrange
+
+
+class RoomPool:
+    """
+    Pool of rooms that still have free spaces.
+    Rooms are kept in a list with a room -> position index so that
+    adding, discarding and picking a random room are all O(1).
+    The free spaces of the rooms are kept in a Fenwick tree over the
+    same positions, so a random free space can be drawn in O(log n)
+    without walking the pool.
+    lock guards the pool and the occupancy of its rooms, it does
+    nothing unless a real lock is passed in
+    """
+
+    def __init__(self, lock=None):
+        self.rooms = []
+        self.positions = {}
+        # free spaces per position and the 1-based Fenwick tree over them
+        self.spaces = []
+        self.tree = [0]
+        self.lock = lock if lock is not None else nullcontext()
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def __contains__(self, room):
+        return room in self.positions
+
+    def __iter__(self):
+        return iter(self.rooms)
+
+    def add(self, room):
+        """
+        Adds room to the pool, or updates its free spaces
+        if it is already in it
+        :param room:
+        :return:
+        """
+        if room in self.positions:
+            self.update(room)
+            return
+        self.positions[room] = len(self.rooms)
+        self.rooms.append(room)
+        spaces = max(room.spaces, 0)
+        self.spaces.append(spaces)
+        # a new last node covers the positions below it that share its subtree
+        index = len(self.tree)
+        self.tree.append(spaces + self.prefix(index - 1) - self.prefix(index - (index & -index)))
+
+    def discard(self, room):
+        """
+        Removes room from the pool by swapping it with the last room
+        :param room:
+        :return:
+        """
+        position = self.positions.pop(room, None)
+        if position is None:
+            return
+        last_room = self.rooms.pop()
+        last_spaces = self.spaces.pop()
+        # nothing sums the last node of the tree but itself
+        self.tree.pop()
+        if last_room is not room:
+            self.rooms[position] = last_room
+            self.positions[last_room] = position
+            self.set_spaces(position, last_spaces)
+
+    def update(self, room):
+        """
+        Records a change in the free spaces of a room in the pool
+        :param room:
+        :return:
+        """
+        position = self.positions.get(room)
+        if position is not None:
+            self.set_spaces(position, max(room.spaces, 0))
+
+    def set_spaces(self, position, spaces):
+        delta = spaces - self.spaces[position]
+        self.spaces[position] = spaces
+        index = position + 1
+        tree = self.tree
+        while index < len(tree):
+            tree[index] += delta
+            index += index & -index
+
+    def prefix(self, count):
+        """
+        :return: free spaces in the first count positions
+        """
+        total = 0
+        tree = self.tree
+        while count:
+            total += tree[count]
+            count &= count - 1
+        return total
+
+    def free_spaces(self):
+        """
+        :return: free spaces across the pool
+        """
+        return self.prefix(len(self.rooms))
+
+    def find_space(self, space):
+        """
+        Finds the position holding a free space
+        :param space: number of the space, below free_spaces()
+        :return: position
+        """
+        tree = self.tree
+        position = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            index = position + step
+            if index < len(tree) and tree[index] <= space:
+                position = index
+                space -= tree[index]
+            step >>= 1
+        return position
+
+    def draw_spaces(self, count):
+        """
+        Draws up to count free spaces uniformly at random without
+        replacement. Nothing is taken, callers fill the rooms after.
+        Rooms whose spaces changed behind the pool's back are
+        corrected as they are met. Call with the pool lock held
+        :param count:
+        :return: list of rooms, one per space drawn
+        """
+        drawn = []
+        taken = {}
+        total = self.free_spaces()
+        while len(drawn) < count and total > 0:
+            position = self.find_space(randrange(total))
+            room = self.rooms[position]
+            spaces = max(room.spaces - taken.get(position, 0), 0)
+            if spaces != self.spaces[position]:
+                total += spaces - self.spaces[position]
+                self.set_spaces(position, spaces)
+                continue
+            self.set_spaces(position, spaces - 1)
+            taken[position] = taken.get(position, 0) + 1
+            total -= 1
+            drawn.append(room)
+        for position, spaces in taken.items():
+            self.set_spaces(position, self.spaces[position] + spaces)
+        return drawn
+
+    def pick(self):
+        """
+        Picks a random room with free space.
+        Rooms found to be full are dropped from the pool
+        :return: room or None
+        """
+        while self.rooms:
+            room = choice(self.rooms)
+            if room.contains_space():
+                return room
+            self.discard(room)
+        return None
+
+
+class WaitingList:
+    """
+    Insertion ordered set of people waiting for a room.
+    Every person gets a ticket when they join, lists that share a
+    ticket counter can be drained together oldest first
+    """
+
+    def __init__(self, tickets=None):
+        self.people = {}
+        self.tickets = tickets if tickets is not None else count()
+
+    def __len__(self):
+        return len(self.people)
+
+    def __contains__(self, person):
+        return person in self.people
+
+    def __iter__(self):
+        return iter(self.people)
+
+    def append(self, person):
+        """
+        Adds person to the end of the list if they are not waiting yet
+        :param person:
+        :return:
+        """
+        if person not in self.people:
+            self.people[person] = next(self.tickets)
+
+    def remove(self, person):
+        """
+        Removes a waiting person
+        :param person:
+        :return:
+        """
+        try:
+            del self.people[person]
+        except KeyError:
+            raise ValueError('%s is not waiting for a room' % person.name)
+
+    def discard(self, person):
+        """
+        Removes person if they are waiting
+        :param person:
+        :return:
+        """
+        self.people.pop(person, None)
+
+    def tickets_in_order(self):
+        """
+        :return: generator of (ticket, person, waiting list)
+        """
+        for person, ticket in self.people.items():
+            yield ticket, person, self
+
+
+def oldest_waiting(waiting_lists, limit):
+    """
+    Gets the people who have waited longest across waiting lists
+    :param waiting_lists: lists sharing a ticket counter
+    :param limit: most people to return
+    :return: list of (person, waiting list) pairs, oldest first
+    """
+    merged = merge(*[waiting_list.tickets_in_order() for waiting_list in waiting_lists],
+                   key=itemgetter(0))
+    return [(person, waiting_list) for _, person, waiting_list in islice(merged, limit)]
@@ -0,0 +1,83 @@
+"""
+Reporters receive the events the Dojo emits while it allocates rooms.
+Messages are %-style templates filled from the event fields, so a
+reporter that drops events never pays for formatting them.
+"""
+import json
+
+import click
+
+LEVEL_COLOURS = {
+    'success': 'green',
+    'info': 'cyan',
+    'warning': 'yellow',
+    'error': 'red',
+}
+
+
+class Reporter:
+    """
+    Base reporter, drops every event
+    """
+
+    def emit(self, event, level, message, **fields):
+        """
+        Receives an event from the Dojo
+        :param event: short machine readable name e.g. office_created
+        :param level: success, info, warning or error
+        :param message: %-style template filled from fields
+        :param fields:
+        :return:
+        """
+        pass
+
+
+class NullReporter(Reporter):
+    """
+    Reporter for batch jobs that do not want any output
+    """
+    pass
+
+
+class ConsoleReporter(Reporter):
+    """
+    Prints events to the terminal in colour
+    """
+
+    def emit(self, event, level, message, **fields):
+        click.secho(message % fields, fg=LEVEL_COLOURS.get(level), bold=True)
+
+
+class BufferedReporter(Reporter):
+    """
+    Keeps events in memory until they are flushed to another reporter
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, level, message, **fields):
+        self.events.append((event, level, message, fields))
+
+    def flush(self, reporter):
+        """
+        Sends the buffered events to reporter and clears the buffer
+        :param reporter:
+        :return:
+        """
+        for event, level, message, fields in self.events:
+            reporter.emit(event, level, message, **fields)
+        self.events = []
+
+
+class JsonLinesReporter(Reporter):
+    """
+    Writes one JSON object per event to a file object
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def emit(self, event, level, message, **fields):
+        record = dict(fields, event=event, level=level, message=message % fields)
+        self.stream.write(json.dumps(record) + '\n')
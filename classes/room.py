@@ -1,52 +1,51 @@
 class Room:
+    __slots__ = ('name', 'spaces', 'occupants', 'db_id')
+    capacity = 0
+
     def __init__(self, name):
         self.name = name
+        self.spaces = self.capacity
+        self.occupants = []
+        self.db_id = None
+
+    def contains_space(self):
+        return self.spaces > 0
 
 class Person:
+    __slots__ = ('name', 'office', 'db_id')
+
     def __init__(self, name, office):
         self.name = name
         self.office = office
+        self.db_id = None
 
 class Office(Room):
-    def __init__(self, name):
-        super().__init__(name)
-        self.name = name
-        self.spaces = 6
-        self.occupants = []
-
-    def contains_space(self):
-        return self.spaces > 0
+    __slots__ = ()
+    capacity = 6
 
 class LivingSpace(Room):
-    def __init__(self, name):
-        super().__init__(name)
-        self.name = name
-        self.spaces = 4
-        self.occupants = []
-
-    def contains_space(self):
-        return self.spaces > 0
+    __slots__ = ()
+    capacity = 4
 
 
 class Fellow(Person):
+    __slots__ = ('living_place', 'wants_accomodation')
+
     def __init__(self, name, wants_accommodation):
         super().__init__(name, None)
-        self.name = name
-        self.office = None
         self.living_place = None
-        self.wants_accomodation = wants_accommodation
+        # Accepts the 'Y'/'N' flag used by the CLI and roster files
+        self.wants_accomodation = wants_accommodation in (True, 'Y')
 
     def __str__(self) -> str:
         return 'Fellow'
 
 
 class Staff(Person):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name, None)
-        self.name = name
-        self.office = None
 
     def __str__(self) -> str:
         return 'Staff'
-
-
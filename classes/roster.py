@@ -0,0 +1,97 @@
+"""
+Streaming helpers for reading people from roster files.
+A roster line looks like: FIRST LAST FELLOW|STAFF [Y|N]
+"""
+from itertools import islice
+
+PERSON_TYPES = ('FELLOW', 'STAFF')
+ACCOMMODATION_CHOICES = ('Y', 'N')
+
+
+class LoadReport:
+    """
+    Progress counters and rejected rows of a roster load
+    """
+
+    def __init__(self, max_rejects=100, rejects_file=None):
+        self.lines_read = 0
+        self.loaded = 0
+        self.chunks = 0
+        self.rejected = 0
+        self.rejects = []
+        self.max_rejects = max_rejects
+        self.rejects_file = rejects_file
+
+    def reject(self, line_number, line, reason):
+        """
+        Records a malformed row. Only the first max_rejects rows
+        are kept in memory, every row goes to rejects_file if given
+        :param line_number:
+        :param line:
+        :param reason:
+        :return:
+        """
+        self.rejected += 1
+        line = line.rstrip('\n')
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append((line_number, line, reason))
+        if self.rejects_file is not None:
+            self.rejects_file.write('%d\t%s\t%s\n' % (line_number, reason, line))
+
+
+def parse_line(line):
+    """
+    Parses one roster line
+    :param line:
+    :return: (name, person_type, wants_accomodation) or a reason string
+    """
+    words = line.split()
+    if len(words) < 3:
+        return 'expected FIRST LAST FELLOW|STAFF [Y|N]'
+    if len(words) > 4:
+        return 'too many fields'
+
+    person_type = words[2]
+    if person_type not in PERSON_TYPES:
+        return 'unknown person type %s' % person_type
+
+    wants_accomodation = words[3] if len(words) == 4 else 'N'
+    if wants_accomodation not in ACCOMMODATION_CHOICES:
+        return 'accommodation should be Y or N'
+    if person_type == 'STAFF' and wants_accomodation == 'Y':
+        return 'Staff can not have accomodation'
+
+    return words[0] + ' ' + words[1], person_type, wants_accomodation
+
+
+def parse_roster(lines, report):
+    """
+    Lazily parses roster lines, skipping blank lines and
+    recording malformed ones in the report
+    :param lines: any iterable of lines, e.g. an open file
+    :param report: LoadReport
+    :return: generator of (name, person_type, wants_accomodation)
+    """
+    for line_number, line in enumerate(lines, 1):
+        report.lines_read = line_number
+        if not line.strip():
+            continue
+        person = parse_line(line)
+        if isinstance(person, str):
+            report.reject(line_number, line, person)
+        else:
+            yield person
+
+
+def chunked(iterable, size):
+    """
+    Splits an iterable into lists of at most size items
+    :param iterable:
+    :param size:
+    :return: generator of lists
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
@@ -0,0 +1,237 @@
+"""
+Asyncio front-end that serves one Dojo to many clients over a TCP or
+Unix socket. The protocol is JSON lines: every request is an object
+with an op, optional args and an optional id that is echoed back.
+
+    {"id": 1, "op": "add_person", "args": {"name": "JIM KIM", "person_type": "STAFF"}}
+    {"id": 1, "ok": true, "result": {"name": "JIM KIM", "office": "blue", ...}}
+
+add_person requests that arrive within batch_window of each other are
+allocated together in a single allocate_batch pass.
+"""
+import asyncio
+import json
+
+from classes.dojo import Dojo
+from classes.export import allocation_records, unallocated_records, \
+    ALLOCATION_FIELDS, UNALLOCATED_FIELDS
+from classes.reporter import NullReporter
+from classes.roster import PERSON_TYPES, ACCOMMODATION_CHOICES
+
+ROOM_TYPES = ('office', 'living_space')
+
+
+class RequestError(Exception):
+    """
+    A request that can not be served, the message goes back to the client
+    """
+    pass
+
+
+class DojoService:
+    """
+    Serves requests against a single Dojo. All requests run on the event
+    loop thread, so the Dojo needs no locks
+    """
+
+    def __init__(self, dojo=None, batch_window=0.002, max_batch=1000):
+        """
+        :param dojo: Dojo to serve, a quiet new one by default
+        :param batch_window: seconds to wait for more add_person requests
+                             before allocating a batch
+        :param max_batch: allocate at once when this many adds are waiting
+        """
+        self.dojo = dojo or Dojo(NullReporter())
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.pending = []
+        self.flush_handle = None
+        self.batches = 0
+        self.operations = {
+            'create_room': self.create_room,
+            'add_person': self.add_person,
+            'reallocate_person': self.reallocate_person,
+            'print_room': self.print_room,
+            'allocations': self.allocations,
+            'unallocated': self.unallocated,
+        }
+
+    async def handle_client(self, reader, writer):
+        """
+        Serves the requests of one connection until it closes.
+        Requests are answered as they complete, a slow add does
+        not hold up the requests behind it
+        """
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self.respond(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer):
+        response = await self.handle_line(line)
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+    async def handle_line(self, line):
+        """
+        Runs one request line
+        :param line: JSON encoded request
+        :return: response dict
+        """
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RequestError('Request is not valid JSON')
+            if not isinstance(request, dict):
+                raise RequestError('Request should be a JSON object')
+            request_id = request.get('id')
+            operation = self.operations.get(request.get('op'))
+            if operation is None:
+                raise RequestError('Unknown op %s, expected one of %s'
+                                   % (request.get('op'), ', '.join(self.operations)))
+            args = request.get('args') or {}
+            if not isinstance(args, dict):
+                raise RequestError('args should be a JSON object')
+            result = await operation(**args)
+        except (RequestError, TypeError, ValueError) as e:
+            return {'id': request_id, 'ok': False, 'error': str(e)}
+        except Exception as e:
+            # one broken request must not cost the client its reply
+            return {'id': request_id, 'ok': False,
+                    'error': 'Internal error: %s: %s' % (type(e).__name__, e)}
+        return {'id': request_id, 'ok': True, 'result': result}
+
+    async def create_room(self, room_type, room_names, backfill=None):
+        """
+        :return: names of the rooms that were created
+        """
+        if room_type not in ROOM_TYPES:
+            raise RequestError('room_type should be office or living_space')
+        new_names = [name for name in room_names if not self.dojo.is_room_exists(name)]
+        self.dojo.create_room(room_names, room_type, backfill)
+        return [name for name in new_names if self.dojo.is_room_exists(name)]
+
+    async def add_person(self, name, person_type, wants_accommodation='N'):
+        """
+        Queues the person for the next allocation batch
+        :return: the rooms the person was given
+        """
+        if not isinstance(name, str) or not name.strip():
+            raise RequestError('name should be a non-empty string')
+        if person_type not in PERSON_TYPES:
+            raise RequestError('person_type should be FELLOW or STAFF')
+        if wants_accommodation not in ACCOMMODATION_CHOICES:
+            raise RequestError('wants_accommodation should be Y or N')
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(((name, person_type, wants_accommodation), future))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                self.batch_window, self.flush)
+        return await future
+
+    def flush(self):
+        """
+        Allocates every queued add_person request in one batch
+        """
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        self.batches += 1
+        try:
+            result = self.dojo.allocate_batch(person for person, _ in pending)
+        except Exception as e:
+            for _, future in pending:
+                if not future.cancelled():
+                    future.set_exception(e)
+            return
+
+        # allocate_batch keeps the order of each person type
+        fellows = iter(result.fellows)
+        staff = iter(result.staff)
+        for (_, person_type, _), future in pending:
+            person = next(fellows) if person_type == 'FELLOW' else next(staff)
+            if not future.cancelled():
+                future.set_result(self.describe(person))
+
+    @staticmethod
+    def describe(person):
+        description = {'name': person.name, 'person_type': str(person),
+                       'office': person.office.name if person.office else None}
+        if str(person) == 'Fellow':
+            description['living_space'] = \
+                person.living_place.name if person.living_place else None
+        return description
+
+    async def reallocate_person(self, name, room_name):
+        """
+        :return: the person's rooms after the move
+        """
+        result = self.dojo.reallocate_many([(name, room_name)])
+        if result.errors:
+            raise RequestError(result.errors[0][1])
+        return self.describe(result.moved[0][0])
+
+    async def print_room(self, room_name):
+        """
+        :return: names of the people in the room
+        """
+        room = self.dojo.get_room(room_name)
+        if not room:
+            raise RequestError('Room with name %s does not exist' % room_name)
+        with self.dojo.get_free_pool(room).lock:
+            return [person.name for person in room.occupants]
+
+    async def allocations(self):
+        """
+        :return: one dict per person in a room
+        """
+        return [dict(zip(ALLOCATION_FIELDS, record))
+                for record in allocation_records(self.dojo)]
+
+    async def unallocated(self):
+        """
+        :return: one dict per person waiting for a room
+        """
+        return [dict(zip(UNALLOCATED_FIELDS, record))
+                for record in unallocated_records(self.dojo)]
+
+
+async def start_service(service, host='127.0.0.1', port=8765, path=None):
+    """
+    Starts serving on a Unix socket at path, or on host and port
+    :return: asyncio Server
+    """
+    if path:
+        return await asyncio.start_unix_server(service.handle_client, path)
+    return await asyncio.start_server(service.handle_client, host, port)
+
+
+async def serve(dojo, host='127.0.0.1', port=8765, path=None):
+    """
+    Serves dojo until cancelled
+    :param dojo:
+    :param host:
+    :param port:
+    :param path: Unix socket path, used instead of host and port
+    :return:
+    """
+    server = await start_service(DojoService(dojo), host, port, path)
+    async with server:
+        await server.serve_forever()
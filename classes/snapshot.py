@@ -0,0 +1,253 @@
+"""
+Compact binary snapshot of a Dojo, a faster alternative to the
+SQLite round-trip of save_state and load_state for big campuses.
+
+A snapshot is a header followed by length-prefixed sections:
+    strings            every name once, UTF-8, separated by NUL bytes
+    room_types         one byte per room, 0 office and 1 living space
+    room_names         uint32 per room, index into the strings
+    room_spaces        int32 per room
+    person_types       one byte per person, 0 fellow and 1 staff
+    person_wants       one byte per person, 1 if they want accommodation
+    person_names       uint32 per person, index into the strings
+    occupant_counts    uint32 per room
+    occupants          uint32 person indexes, room after room
+    waiting_lists      one byte per waiting person, which list they are on
+    waiting_people     uint32 person indexes, oldest first
+
+The file is built in memory and written with a single write, and
+read back through mmap with every section decoded in bulk.
+"""
+import gc
+import mmap
+import os
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+from itertools import chain
+
+from classes.pool import oldest_waiting
+from classes.room import Office, LivingSpace, Fellow, Staff
+
+MAGIC = b'DOJOSNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sHH')
+SECTION_LENGTH = struct.Struct('<Q')
+SECTIONS = ('strings', 'room_types', 'room_names', 'room_spaces', 'person_types',
+            'person_wants', 'person_names', 'occupant_counts', 'occupants',
+            'waiting_lists', 'waiting_people')
+LITTLE_ENDIAN, BIG_ENDIAN = 0, 1
+BYTE_ORDER = LITTLE_ENDIAN if sys.byteorder == 'little' else BIG_ENDIAN
+
+
+class SnapshotError(Exception):
+    """
+    Raised for files that are not snapshots this version can read
+    """
+    pass
+
+
+@contextmanager
+def gc_paused():
+    """
+    Pauses the cyclic garbage collector. Creating millions of objects
+    otherwise triggers collection after collection over all of them
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def string_table(names):
+    """
+    Interns names, each distinct name is stored once
+    :param names: list of names
+    :return: (table bytes, list of indexes into the table)
+    """
+    strings = list(dict.fromkeys(names))
+    indexes = dict(zip(strings, range(len(strings))))
+    table = '\0'.join(strings)
+    if table.count('\0') != max(len(strings) - 1, 0):
+        raise ValueError('Names can not contain NUL characters')
+    return table.encode(), list(map(indexes.__getitem__, names))
+
+
+def snapshot_bytes(dojo):
+    """
+    Encodes the state of dojo
+    :param dojo:
+    :return: bytes of the whole snapshot
+    """
+    rooms = dojo.all_offices + dojo.all_living_spaces
+    people = dojo.all_fellows + dojo.all_staff
+    person_indexes = dict(zip(people, range(len(people))))
+    waiting_lists = dojo.waiting_lists()
+    list_numbers = {id(waiting_list): number
+                    for number, waiting_list in enumerate(waiting_lists)}
+    waiting = oldest_waiting(waiting_lists, sum(len(w) for w in waiting_lists))
+
+    table, name_indexes = string_table([room.name for room in rooms] +
+                                       [person.name for person in people])
+    sections = {
+        'strings': table,
+        'room_types': bytes(len(dojo.all_offices)) + bytes([1]) * len(dojo.all_living_spaces),
+        'room_names': array('I', name_indexes[:len(rooms)]),
+        'room_spaces': array('i', [room.spaces for room in rooms]),
+        'person_types': bytes(len(dojo.all_fellows)) + bytes([1]) * len(dojo.all_staff),
+        'person_wants': bytes([fellow.wants_accomodation for fellow in dojo.all_fellows]) +
+                        bytes(len(dojo.all_staff)),
+        'person_names': array('I', name_indexes[len(rooms):]),
+        'occupant_counts': array('I', [len(room.occupants) for room in rooms]),
+        'occupants': array('I', map(person_indexes.__getitem__,
+                                    chain.from_iterable(room.occupants for room in rooms))),
+        'waiting_lists': bytes([list_numbers[id(waiting_list)]
+                                for _, waiting_list in waiting]),
+        'waiting_people': array('I', [person_indexes[person] for person, _ in waiting]),
+    }
+
+    parts = [HEADER.pack(MAGIC, VERSION, BYTE_ORDER)]
+    for name in SECTIONS:
+        data = sections[name]
+        data = data.tobytes() if isinstance(data, array) else data
+        parts.append(SECTION_LENGTH.pack(len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def write_snapshot(dojo, path):
+    """
+    Writes a snapshot of dojo to path in a single write. The file is
+    written next to path first and renamed over it once it is on disk
+    :param dojo:
+    :param path:
+    :return: size of the snapshot in bytes
+    """
+    with gc_paused():
+        data = snapshot_bytes(dojo)
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+    return len(data)
+
+
+def read_sections(buffer):
+    """
+    Splits a snapshot into its sections
+    :param buffer: bytes like object holding the snapshot, e.g. an mmap
+    :return: dict of section name -> bytes
+    """
+    if len(buffer) < HEADER.size:
+        raise SnapshotError('File is too short to be a snapshot')
+    magic, version, byte_order = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise SnapshotError('File is not a Dojo snapshot')
+    if version != VERSION:
+        raise SnapshotError('Snapshot version %d is not supported' % version)
+
+    sections = {'byte_order': byte_order}
+    offset = HEADER.size
+    for name in SECTIONS:
+        if offset + SECTION_LENGTH.size > len(buffer):
+            raise SnapshotError('Snapshot is truncated')
+        length, = SECTION_LENGTH.unpack_from(buffer, offset)
+        offset += SECTION_LENGTH.size
+        if offset + length > len(buffer):
+            raise SnapshotError('Snapshot is truncated')
+        sections[name] = buffer[offset:offset + length]
+        offset += length
+    return sections
+
+
+def integers(sections, name, typecode):
+    """
+    Decodes a section of 32 bit integers
+    :return: list of ints
+    """
+    values = array(typecode)
+    values.frombytes(sections[name])
+    if sections['byte_order'] != BYTE_ORDER:
+        values.byteswap()
+    return values.tolist()
+
+
+def load_snapshot(dojo, path):
+    """
+    Adds the rooms and people in the snapshot at path to dojo
+    :param dojo:
+    :param path:
+    :return: (rooms loaded, people loaded)
+    """
+    with gc_paused():
+        return add_snapshot(dojo, path)
+
+
+def add_snapshot(dojo, path):
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < HEADER.size:
+            raise SnapshotError('File is too short to be a snapshot')
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            sections = read_sections(buffer)
+    strings = sections['strings'].decode().split('\0')
+    room_types = sections['room_types']
+    room_names = integers(sections, 'room_names', 'I')
+    room_spaces = integers(sections, 'room_spaces', 'i')
+    person_types = sections['person_types']
+    person_wants = sections['person_wants']
+    person_names = integers(sections, 'person_names', 'I')
+    occupant_counts = integers(sections, 'occupant_counts', 'I')
+    occupants = integers(sections, 'occupants', 'I')
+    waiting_lists = sections['waiting_lists']
+    waiting_people = integers(sections, 'waiting_people', 'I')
+
+    people = [Fellow(strings[name], bool(wants)) if person_type == 0
+              else Staff(strings[name])
+              for name, person_type, wants in zip(person_names, person_types,
+                                                  person_wants)]
+    occupants = list(map(people.__getitem__, occupants))
+    rooms = []
+    start = 0
+    for name, room_type, spaces, count in zip(room_names, room_types, room_spaces,
+                                              occupant_counts):
+        end = start + count
+        if room_type == 0:
+            room = Office(strings[name])
+            room.occupants = occupants[start:end]
+            for person in room.occupants:
+                person.office = room
+        else:
+            room = LivingSpace(strings[name])
+            room.occupants = occupants[start:end]
+            for person in room.occupants:
+                person.living_place = room
+        room.spaces = spaces
+        start = end
+        rooms.append(room)
+
+    # registered in bulk, one call per object is too slow for big campuses
+    dojo.all_offices.extend(room for room in rooms if isinstance(room, Office))
+    dojo.all_living_spaces.extend(room for room in rooms if isinstance(room, LivingSpace))
+    dojo.rooms.update((room.name, room) for room in rooms)
+    for room in rooms:
+        if room.contains_space():
+            dojo.get_free_pool(room).add(room)
+    dojo.all_fellows.extend(person for person in people if isinstance(person, Fellow))
+    dojo.all_staff.extend(person for person in people if isinstance(person, Staff))
+    # when names clash the first person keeps the name, as in register_person
+    names = dict(zip(reversed([person.name for person in people]), reversed(people)))
+    names.update(dojo.people)
+    dojo.people.update(names)
+    dojo.dirty_objects.update(dict.fromkeys(rooms))
+    dojo.dirty_objects.update(dict.fromkeys(people))
+
+    lists = dojo.waiting_lists()
+    for list_number, index in zip(waiting_lists, waiting_people):
+        lists[list_number].append(people[index])
+    return len(rooms), len(people)
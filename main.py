@@ -2,15 +2,21 @@
 This example uses docopt with the built in cmd module to demonstrate an
 interactive command application.
 Usage:
-    (dojo) create_room <room_type> <room_name>...
+    (dojo) create_room <room_type> <room_name>... [--backfill=policy]
     (dojo) add_person <first_name> <last_name> <person_type> [<wants_accommodation>]
     (dojo) print_room <room_name>
-    (dojo) print_allocations [--o=filename]
-    (dojo) print_unallocated [--o=filename]
+    (dojo) print_allocations [--o=filename] [--format=format] [--gzip]
+    (dojo) print_unallocated [--o=filename] [--format=format] [--gzip]
     (dojo) reallocate_person <first_name> <last_name> <new_room_name>
+    (dojo) reallocate_many <file_path>
     (dojo) load_people <file_path>
     (dojo) save_state [--db=sqlite_database]
-    (dojo) load_state <sqlite_database>
+    (dojo) load_state [--db=sqlite_database]
+    (dojo) serve [--port=port] [--socket=path]
+    (dojo) save_snapshot <snapshot_file>
+    (dojo) load_snapshot <snapshot_file>
+    (dojo) open_journal <journal_file>
+    (dojo) compact_journal
     (dojo) (-i | --interactive)
     (dojo) (-h | --help)
 Arguments:
@@ -19,11 +25,18 @@ Arguments:
 Options:
     -i, --interactive  Interactive Mode
     -h, --help  Show this screen and exit.
-    --o=filename
-    --db=sqlite_database
+    --backfill=policy  Fill new rooms from the waiting lists, fifo or random
+    --o=filename       Write the report to this path instead of the screen
+    --format=format    Export as text, csv, jsonl or columnar, text by default
+    --gzip             Compress the export
+    --db=sqlite_database  Database file, .db is added without an extension, or a URL
+    --port=port        TCP port to serve JSON lines requests on [default: 8765]
+    --socket=path      Serve on a Unix socket instead of a TCP port
 """
 
 from classes.dojo import Dojo
+from classes.export import export_allocations, export_unallocated
+from classes.snapshot import SnapshotError
 import sys
 import cmd
 from docopt import docopt, DocoptExit
@@ -64,6 +77,19 @@ def docopt_cmd(func):
 dojo = Dojo()
 
 
+def export(exporter, arg):
+    """
+    Runs an exporter with the --o, --format and --gzip options
+    """
+    if arg['--o'] is None:
+        print('--format and --gzip need an output file, pass it with --o')
+        return
+    try:
+        exporter(dojo, arg['--o'], arg['--format'] or 'text', arg['--gzip'])
+    except ValueError as e:
+        print(e)
+
+
 class TheDojo(cmd.Cmd):
     intro = 'Welcome to THE DOJO OFFICE ALLOCATION PROGRAM!' \
             + ' (type help for a list of commands.)'
@@ -73,10 +99,13 @@ class TheDojo(cmd.Cmd):
 
     @docopt_cmd
     def do_create_room(self, arg):
-        """Usage: create_room <room_type> <room_name>..."""
+        """Usage: create_room <room_type> <room_name>... [--backfill=policy]"""
         room_names = (arg['<room_name>'])
         room_type = arg['<room_type>']
-        dojo.create_room(room_names, room_type)
+        try:
+            dojo.create_room(room_names, room_type, arg['--backfill'])
+        except ValueError as e:
+            print(e)
 
     @docopt_cmd
     def do_add_person(self, arg):
@@ -98,19 +127,19 @@ class TheDojo(cmd.Cmd):
 
     @docopt_cmd
     def do_print_allocations(self, arg):
-        """Usage: print_allocations [--o=filename]"""
-        if arg['--o'] is None:
+        """Usage: print_allocations [--o=filename] [--format=format] [--gzip]"""
+        if arg['--o'] is None and arg['--format'] is None and not arg['--gzip']:
             dojo.print_allocations()
         else:
-            dojo.print_allocations_to_file(arg['--o'])
+            export(export_allocations, arg)
 
     @docopt_cmd
     def do_print_unallocated(self, arg):
-        """Usage: print_unallocated [--o=filename]"""
-        if arg['--o'] is None:
+        """Usage: print_unallocated [--o=filename] [--format=format] [--gzip]"""
+        if arg['--o'] is None and arg['--format'] is None and not arg['--gzip']:
             dojo.print_un_allocations()
         else:
-            dojo.print_un_allocations_to_file(arg['--o'])
+            export(export_unallocated, arg)
 
     @docopt_cmd
     def do_reallocate_person(self, arg):
@@ -119,6 +148,11 @@ class TheDojo(cmd.Cmd):
         room_name = arg['<new_room_name>']
         dojo.re_allocate_person(person_name, room_name)
 
+    @docopt_cmd
+    def do_reallocate_many(self, arg):
+        """Usage: reallocate_many <file_path>"""
+        dojo.load_moves(arg['<file_path>'])
+
     @docopt_cmd
     def do_load_people(self, arg):
         """Usage: load_people <file_path>"""
@@ -139,11 +173,53 @@ class TheDojo(cmd.Cmd):
         if arg['--db'] is None:
             dojo.load_state()
         else:
-            dojo.load_state(arg['--o'])
+            dojo.load_state(arg['--db'])
+
+    @docopt_cmd
+    def do_save_snapshot(self, arg):
+        """Usage: save_snapshot <snapshot_file>"""
+        dojo.save_snapshot(arg['<snapshot_file>'])
+
+    @docopt_cmd
+    def do_load_snapshot(self, arg):
+        """Usage: load_snapshot <snapshot_file>"""
+        try:
+            dojo.load_snapshot(arg['<snapshot_file>'])
+        except SnapshotError as e:
+            print(e)
+
+    @docopt_cmd
+    def do_open_journal(self, arg):
+        """Usage: open_journal <journal_file>"""
+        dojo.open_journal(arg['<journal_file>'])
+
+    @docopt_cmd
+    def do_compact_journal(self, arg):
+        """Usage: compact_journal"""
+        if dojo.journal is None:
+            print('No journal is open, open one with open_journal')
+        else:
+            dojo.compact_journal()
+
+    @docopt_cmd
+    def do_serve(self, arg):
+        """Usage: serve [--port=port] [--socket=path]"""
+        # asyncio is only needed here, keep it out of every CLI start
+        import asyncio
+        from classes.service import serve
+
+        port = int(arg['--port'] or 8765)
+        print('Serving the Dojo on %s, press Ctrl+C to stop'
+              % (arg['--socket'] or 'port %d' % port))
+        try:
+            asyncio.run(serve(dojo, port=port, path=arg['--socket']))
+        except KeyboardInterrupt:
+            pass
 
     def do_quit(self, arg):
         """Quits out of Interactive Mode."""
 
+        dojo.close_journal()
         print('******Good Bye!******')
         exit()
 
@@ -1,14 +1,26 @@
 """
 Table Definitions for Dojo objects
 """
-from sqlalchemy import create_engine, ForeignKey
+import os
+
+from sqlalchemy import create_engine, event, ForeignKey
 from sqlalchemy import Column, Integer, String
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 
-
-# engine = create_engine('sqlite:///..\modals\Dojo.db', echo=True)
-engine = create_engine('sqlite:///Dojo.db', echo=True)
+DEFAULT_DATABASE = 'Dojo.db'
+# WAL lets readers keep reading the last committed state while a save
+# is writing, NORMAL sync is safe under WAL and skips most fsyncs,
+# a negative cache_size is in KiB
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'busy_timeout': 5000,
+}
 Base = declarative_base()
+engines = {}
 
 
 class OfficeModel(Base):
@@ -18,7 +30,7 @@ class OfficeModel(Base):
     __tablename__ = "office"
 
     office_id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, unique=True, index=True)
     spaces = Column(Integer)
 
     # ----------------------------------------------------------------------
@@ -39,7 +51,7 @@ class LivingSpaceModel(Base):
     __tablename__ = "living_space"
 
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, unique=True, index=True)
     spaces = Column(Integer)
 
     def __init__(self, name, spaces):
@@ -59,17 +71,17 @@ class StaffModel(Base):
     __tablename__ = "staff"
 
     id = Column(Integer, primary_key=True)
-    name = Column(String(50))
-    office = Column(String(25))
+    name = Column(String(50), index=True)
+    office_id = Column(Integer, ForeignKey('office.office_id'), index=True)
 
-    def __init__(self, name, office):
+    def __init__(self, name, office_id):
         """
         Attributes
         :param name: 
         :param office_id: 
         """
         self.name = name
-        self.office = office
+        self.office_id = office_id
 
 
 class FellowModel(Base):
@@ -79,12 +91,12 @@ class FellowModel(Base):
     __tablename__ = "fellow"
 
     id = Column(Integer, primary_key=True)
-    name = Column(String(50))
-    office = Column(String(25))
-    living_space = Column(String(25))
+    name = Column(String(50), index=True)
+    office_id = Column(Integer, ForeignKey('office.office_id'), index=True)
+    living_space_id = Column(Integer, ForeignKey('living_space.id'), index=True)
     wants_accomodation = Column(String(2))
 
-    def __init__(self, name, office, living_space, wants_accomadation):
+    def __init__(self, name, office_id, living_space_id, wants_accomadation):
         """
         Attributes
         :param name: 
@@ -92,10 +104,126 @@ class FellowModel(Base):
         :param living_space_id: 
         """
         self.name = name
-        self.office = office
-        self.living_space = living_space
+        self.office_id = office_id
+        self.living_space_id = living_space_id
         self.wants_accomodation = wants_accomadation
 
 
-# create tables
-Base.metadata.create_all(engine)
+LEGACY_TABLES = ('office', 'living_space', 'staff', 'fellow')
+
+
+def is_legacy_schema(engine):
+    """
+    Checks if the database still uses the old layout where people
+    reference their rooms by name
+    :param engine:
+    :return boolean:
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table('staff'):
+        return False
+    columns = [column['name'] for column in inspector.get_columns('staff')]
+    return 'office' in columns
+
+
+def migrate_legacy_schema(engine):
+    """
+    Moves a database from the old layout to the normalized one.
+    Tables are renamed, recreated with foreign keys and unique names,
+    then people are joined to their rooms by name. When room names
+    were duplicated the first room keeps the name
+    :param engine:
+    :return boolean: True if the database was migrated
+    """
+    if not is_legacy_schema(engine):
+        return False
+
+    with engine.begin() as connection:
+        for table in LEGACY_TABLES:
+            connection.execute(text('ALTER TABLE %s RENAME TO legacy_%s' % (table, table)))
+        Base.metadata.create_all(connection)
+        connection.execute(text(
+            'INSERT INTO office (office_id, name, spaces) '
+            'SELECT office_id, name, spaces FROM legacy_office WHERE office_id IN '
+            '(SELECT MIN(office_id) FROM legacy_office GROUP BY name)'))
+        connection.execute(text(
+            'INSERT INTO living_space (id, name, spaces) '
+            'SELECT id, name, spaces FROM legacy_living_space WHERE id IN '
+            '(SELECT MIN(id) FROM legacy_living_space GROUP BY name)'))
+        connection.execute(text(
+            'INSERT INTO staff (id, name, office_id) '
+            'SELECT staff.id, staff.name, office.office_id FROM legacy_staff AS staff '
+            'LEFT JOIN office ON office.name = staff.office'))
+        connection.execute(text(
+            'INSERT INTO fellow (id, name, office_id, living_space_id, wants_accomodation) '
+            'SELECT fellow.id, fellow.name, office.office_id, living_space.id, '
+            'fellow.wants_accomodation FROM legacy_fellow AS fellow '
+            'LEFT JOIN office ON office.name = fellow.office '
+            'LEFT JOIN living_space ON living_space.name = fellow.living_space'))
+        for table in LEGACY_TABLES:
+            connection.execute(text('DROP TABLE legacy_%s' % table))
+    return True
+
+
+def create_tables(engine):
+    """
+    Migrates old databases and creates any missing tables
+    :param engine:
+    :return:
+    """
+    migrate_legacy_schema(engine)
+    Base.metadata.create_all(engine)
+
+
+def database_url(database=None):
+    """
+    Turns a database name, path or URL into a URL.
+    Paths without an extension get .db added, so 'state' is state.db
+    :param database: URL such as sqlite:///dojo.db, a file path,
+                     or None for the default database
+    :return: URL string
+    """
+    database = database or DEFAULT_DATABASE
+    if '://' in database:
+        return database
+    if not os.path.splitext(database)[1]:
+        database += '.db'
+    return 'sqlite:///' + os.path.abspath(database)
+
+
+def set_sqlite_pragmas(pragmas):
+    """
+    Builds a connect listener that applies pragmas to new connections
+    :param pragmas: dict of pragma name -> value
+    :return:
+    """
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute('PRAGMA %s = %s' % (name, value))
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def get_engine(database=None, pragmas=None):
+    """
+    Gets the engine for a database.
+    Engines are created, and their tables migrated and created,
+    the first time a URL is used and cached per URL after that.
+    SQLite connections get SQLITE_PRAGMAS, overridden by pragmas
+    :param database: URL or path, see database_url
+    :param pragmas: dict of extra or replacement SQLite pragmas
+    :return:
+    """
+    url = database_url(database)
+    engine = engines.get(url)
+    if engine is None:
+        engine = create_engine(url)
+        if make_url(url).get_backend_name() == 'sqlite':
+            event.listen(engine, 'connect',
+                         set_sqlite_pragmas(dict(SQLITE_PRAGMAS, **(pragmas or {}))))
+        create_tables(engine)
+        engines[url] = engine
+    return engine
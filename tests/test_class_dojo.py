@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from classes.dojo import Dojo
 from classes.dojo import Fellow
@@ -35,7 +37,7 @@ class TestClassDojo(unittest.TestCase):
     def tests_add_person_to_room_type_living_space(self):
         room_name_list = ['blue']
         self.dojo.create_room(room_name_list, 'living_space')
-        fellow = Fellow('Patrick')
+        fellow = Fellow('Patrick', 'N')
         room = self.dojo.get_available_living_spaces()
         self.dojo.add_person_to_room(fellow, room)
         self.assertEqual(room.occupants[0].name, 'Patrick')
@@ -43,7 +45,7 @@ class TestClassDojo(unittest.TestCase):
     def tests_add_person_to_room_type_office(self):
         room_name_list = ['blue']
         self.dojo.create_room(room_name_list, 'office')
-        fellow = Fellow('Patrick')
+        fellow = Fellow('Patrick', 'N')
         room = self.dojo.get_available_office()
         self.dojo.add_person_to_room(fellow, room)
         self.assertEqual(room.occupants[0].name, 'Patrick')
@@ -185,6 +187,222 @@ class TestClassDojo(unittest.TestCase):
         self.dojo.create_room(['orange'], 'living_space')
         self.assertEqual(self.dojo.re_allocate_person('Samuel','orange'), 'Samuel does not want accommodation')
 
+    def test_full_office_is_dropped_from_free_pool(self):
+        self.dojo.create_room(['blue'], 'office')
+        office = self.dojo.get_room('blue')
+        for i in range(6):
+            self.dojo.add_fellow('name%d' % i)
+        self.assertNotIn(office, self.dojo.free_offices)
+        self.assertFalse(self.dojo.get_available_office())
+
+    def test_reallocation_returns_space_to_free_pool(self):
+        self.dojo.create_room(['blue'], 'office')
+        for i in range(6):
+            self.dojo.add_fellow('name%d' % i)
+        self.dojo.create_room(['red'], 'office')
+        self.dojo.re_allocate_person('name0', 'red')
+        blue = self.dojo.get_room('blue')
+        red = self.dojo.get_room('red')
+        self.assertEqual(blue.spaces, 1)
+        self.assertEqual(red.spaces, 5)
+        self.assertIn(blue, self.dojo.free_offices)
+
+    def test_create_room_skips_duplicate_names(self):
+        self.dojo.create_room(['blue', 'blue'], 'office')
+        self.dojo.create_room(['blue'], 'living_space')
+        self.assertEqual(len(self.dojo.all_offices), 1)
+        self.assertEqual(len(self.dojo.all_living_spaces), 0)
+        self.assertEqual(self.dojo.get_room('blue'), self.dojo.all_offices[0])
+
+    def test_get_person_returns_first_person_with_name(self):
+        fellow = self.dojo.add_fellow('Patrick')
+        self.dojo.add_staff('Patrick')
+        self.assertEqual(self.dojo.get_person('Patrick'), fellow)
+        self.assertFalse(self.dojo.get_person('Jim'))
+
+    def test_allocate_batch_fills_free_spaces(self):
+        self.dojo.create_room(['blue', 'red'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        people = [('fellow%d' % i, 'FELLOW', 'Y') for i in range(10)]
+        people += [('staff%d' % i, 'STAFF', 'N') for i in range(5)]
+        result = self.dojo.allocate_batch(people)
+        self.assertEqual(len(result), 15)
+        self.assertEqual(len(result.unallocated_office), 3)
+        self.assertEqual(len(result.unallocated_living_space), 6)
+        self.assertEqual(len(self.dojo.free_offices), 0)
+        for room in self.dojo.all_offices + self.dojo.all_living_spaces:
+            self.assertEqual(room.spaces, 0)
+        self.assertEqual(len(self.dojo.staff_not_allocated) +
+                         len(self.dojo.fellows_not_allocated_office), 3)
+
+    def test_allocate_batch_with_numpy_strategy(self):
+        self.dojo.create_room(['blue', 'red'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        people = [('fellow%d' % i, 'FELLOW', 'Y') for i in range(15)]
+        result = self.dojo.allocate_batch(people, 'numpy')
+        self.assertEqual(len(result.unallocated_office), 3)
+        self.assertEqual(len(result.unallocated_living_space), 11)
+        for room in self.dojo.all_offices + self.dojo.all_living_spaces:
+            self.assertEqual(room.spaces, 0)
+            self.assertEqual(len(room.occupants), room.capacity)
+
+    def test_allocate_batch_with_preferences(self):
+        self.dojo.create_room(['blue', 'red'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        people = [('fellow%d' % i, 'FELLOW', 'Y') for i in range(6)]
+        people += [('staff%d' % i, 'STAFF', 'N') for i in range(6)]
+        preferences = {'fellow%d' % i: ['red', 'Apple'] for i in range(6)}
+        result = self.dojo.allocate_batch(people, preferences=preferences)
+        self.assertEqual(len(result.unallocated_office), 0)
+        self.assertEqual(len(result.unallocated_living_space), 2)
+        red = self.dojo.get_room('red')
+        self.assertEqual(sorted(person.name for person in red.occupants),
+                         ['fellow%d' % i for i in range(6)])
+        for fellow in result.fellows:
+            self.assertEqual(fellow.office, red)
+
+    def test_allocate_batch_with_unknown_strategy(self):
+        self.assertRaises(ValueError, self.dojo.allocate_batch, [], 'greedy')
+
+    def test_allocate_batch_rejects_unknown_person_type(self):
+        result = self.dojo.allocate_batch([('Jim', 'VISITOR', 'N')])
+        self.assertEqual(result.rejected, ['Jim'])
+        self.assertFalse(self.dojo.get_person('Jim'))
+
+    def test_allocate_batch_with_a_bad_row_adds_nobody(self):
+        self.dojo.create_room(['blue'], 'office')
+        self.assertRaises(ValueError, self.dojo.allocate_batch,
+                          [('Jim', 'STAFF', 'N'), ('Bad', 'STAFF')])
+        self.assertRaises(TypeError, self.dojo.allocate_batch,
+                          [('Jim', 'STAFF', 'N'), (['Bad'], 'STAFF', 'N')])
+        self.assertFalse(self.dojo.get_person('Jim'))
+        self.assertFalse(self.dojo.all_staff)
+        self.assertEqual(self.dojo.get_room('blue').spaces, 6)
+
+    def test_load_people_skips_malformed_rows(self):
+        self.dojo.create_room(['blue'], 'office')
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as fp:
+            fp.write('A B FELLOW Y\n\nC D FELLOW\nE STAFF\nF G STAFF\n')
+        try:
+            report = self.dojo.load_people(path, chunk_size=2)
+        finally:
+            os.remove(path)
+        self.assertEqual(report.loaded, 3)
+        self.assertEqual(report.chunks, 2)
+        self.assertEqual(report.rejected, 1)
+        self.assertEqual(len(self.dojo.all_fellows), 2)
+        self.assertEqual(len(self.dojo.all_staff), 1)
+
+    def test_allocations_text(self):
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        self.dojo.add_fellow('Patrick', 'Y')
+        self.dojo.add_staff('Jim')
+        self.assertEqual(self.dojo.allocations_text(),
+                         'Office BLUE\n'
+                         '---------------------------------------------\n'
+                         'Patrick(Fellow), Jim(Staff), \n\n\n'
+                         'Living Space APPLE\n'
+                         '---------------------------------------------\n'
+                         'Patrick(Fellow), \n\n\n')
+
+    def test_un_allocations_text(self):
+        self.dojo.add_fellow('Patrick', 'Y')
+        self.dojo.add_staff('Jim')
+        self.assertEqual(self.dojo.un_allocations_text(),
+                         'PATRICK, Fellow Unallocated Office\n'
+                         'PATRICK, Fellow Unallocated living space\n'
+                         'JIM, Staff Unallocated Office\n')
+
+    def test_fill_from_waiting_lists_oldest_first(self):
+        self.dojo.add_fellow('Patrick', 'Y')
+        self.dojo.add_staff('Jim')
+        for i in range(5):
+            self.dojo.add_fellow('fellow%d' % i)
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        self.assertEqual(self.dojo.fill_from_waiting_lists(), (6, 1))
+        self.assertEqual([person.name for person in self.dojo.fellows_not_allocated_office],
+                         ['fellow4'])
+        self.assertEqual(len(self.dojo.staff_not_allocated), 0)
+        self.assertEqual(self.dojo.get_person('Jim').office.name, 'blue')
+        self.assertEqual(self.dojo.get_person('Patrick').living_place.name, 'Apple')
+        self.assertEqual(self.dojo.get_room('blue').spaces, 0)
+
+    def test_create_room_fills_waiting_lists_with_auto_backfill(self):
+        self.dojo.auto_backfill = True
+        self.dojo.add_staff('Jim')
+        self.assertIn(self.dojo.get_person('Jim'), self.dojo.staff_not_allocated)
+        self.dojo.create_room(['blue'], 'office')
+        self.assertNotIn(self.dojo.get_person('Jim'), self.dojo.staff_not_allocated)
+        self.assertEqual(self.dojo.get_room('blue').occupants, [self.dojo.get_person('Jim')])
+
+    def test_create_room_without_backfill_overrides_auto_backfill(self):
+        self.dojo.auto_backfill = 'fifo'
+        self.dojo.add_staff('Jim')
+        self.dojo.create_room(['blue'], 'office', backfill=False)
+        self.assertIn(self.dojo.get_person('Jim'), self.dojo.staff_not_allocated)
+        self.assertEqual(self.dojo.get_room('blue').occupants, [])
+
+    def test_create_room_with_random_backfill(self):
+        for i in range(10):
+            self.dojo.add_staff('staff%d' % i)
+        self.dojo.create_room(['blue'], 'office', backfill='random')
+        self.assertEqual(len(self.dojo.staff_not_allocated), 4)
+        self.assertEqual(self.dojo.get_room('blue').spaces, 0)
+        for person in self.dojo.get_room('blue').occupants:
+            self.assertNotIn(person, self.dojo.staff_not_allocated)
+
+    def test_backfill_with_unknown_policy(self):
+        self.assertRaises(ValueError, self.dojo.fill_from_waiting_lists, 'lifo')
+
+    def test_re_allocate_fellow_to_living_space(self):
+        self.dojo.create_room(['Apple', 'Mango'], 'living_space')
+        self.dojo.add_fellow('Patrick', 'Y')
+        person = self.dojo.get_person('Patrick')
+        old_room = person.living_place
+        new_room = 'Mango' if old_room.name == 'Apple' else 'Apple'
+        self.assertEqual(self.dojo.re_allocate_person('Patrick', new_room),
+                         'Patrick has been reallocated to Living Space %s' % new_room)
+        self.assertEqual(person.living_place.name, new_room)
+        self.assertIsNone(person.office)
+        self.assertEqual(old_room.spaces, 4)
+        self.assertEqual(self.dojo.get_room(new_room).spaces, 3)
+
+    def test_reallocate_many_swaps_through_freed_space(self):
+        self.dojo.create_room(['blue'], 'office')
+        for i in range(6):
+            self.dojo.add_staff('staff%d' % i)
+        self.dojo.create_room(['red'], 'office')
+        for i in range(5):
+            self.dojo.add_staff('other%d' % i)
+        # the last move only fits because the second one frees a space in red
+        result = self.dojo.reallocate_many([('staff0', 'red'), ('other0', 'blue'),
+                                            ('staff1', 'red')])
+        self.assertEqual(result.errors, [])
+        self.assertEqual(len(result.moved), 3)
+        blue = self.dojo.get_room('blue')
+        red = self.dojo.get_room('red')
+        self.assertEqual((blue.spaces, red.spaces), (1, 0))
+        self.assertEqual(len(blue.occupants), 5)
+        self.assertEqual(len(red.occupants), 6)
+        self.assertEqual(self.dojo.get_person('staff1').office, red)
+
+    def test_reallocate_many_applies_nothing_when_a_move_is_invalid(self):
+        self.dojo.create_room(['blue', 'red'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        self.dojo.add_staff('Jim')
+        self.dojo.add_fellow('Patrick', 'N')
+        office = self.dojo.get_person('Jim').office
+        other = 'red' if office.name == 'blue' else 'blue'
+        result = self.dojo.reallocate_many([('Jim', other), ('Jim', 'Apple'),
+                                            ('Patrick', 'Apple'), ('Dona', 'blue'),
+                                            ('Jim', 'green')])
+        self.assertEqual([index for index, _ in result.errors], [1, 2, 3, 4])
+        self.assertEqual(result.moved, [])
+        self.assertEqual(self.dojo.get_person('Jim').office, office)
+
     def test_loads_people_from_file(self):
         init_number_of_fellows = len(self.dojo.all_fellows)
         init_number_of_staff = len(self.dojo.all_staff)
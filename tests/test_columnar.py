@@ -0,0 +1,52 @@
+import unittest
+from classes.columnar import ColumnarDojo, assign_slots
+from classes.dojo import Dojo
+from classes.reporter import NullReporter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestColumnarDojo(unittest.TestCase):
+    def setUp(self):
+        self.dojo = ColumnarDojo(NullReporter(), seed=1)
+
+    def test_assign_slots_respects_free_spaces(self):
+        rng = np.random.default_rng(0)
+        picks = assign_slots(np.array([2, 0, 3]), 10, rng)
+        self.assertEqual(len(picks), 10)
+        self.assertEqual(list(np.bincount(picks[picks >= 0], minlength=3)), [2, 0, 3])
+        self.assertEqual(int((picks == -1).sum()), 5)
+
+    def test_allocation_never_exceeds_capacity(self):
+        self.dojo.create_room(['office%d' % i for i in range(10)], 'office')
+        self.dojo.create_room(['living%d' % i for i in range(5)], 'living_space')
+        self.dojo.allocate_batch([('fellow%d' % i, 'FELLOW', 'Y') for i in range(50)])
+        self.dojo.allocate_batch([('staff%d' % i, 'STAFF', 'N') for i in range(20)])
+        occupancy = self.dojo.room_occupancy.values
+        self.assertTrue((occupancy <= self.dojo.room_capacity.values).all())
+        self.assertEqual(int(occupancy.sum()), 60 + 20)
+        no_office, no_living_space, staff = self.dojo.unallocated()
+        self.assertEqual(len(no_office) + len(staff), 10)
+        self.assertEqual(len(no_living_space), 30)
+
+    def test_reports_match_object_dojo(self):
+        dojo = Dojo(NullReporter())
+        for backend in (dojo, self.dojo):
+            backend.create_room(['blue'], 'office')
+            backend.create_room(['Apple'], 'living_space')
+            backend.add_fellow('Patrick', 'Y')
+            backend.add_staff('Jim')
+            # rooms fill up one person at a time so both backends agree
+            for i in range(5):
+                backend.add_fellow('fellow%d' % i, 'Y')
+            backend.add_staff('Samuel')
+        self.assertEqual(self.dojo.allocations_text(), dojo.allocations_text())
+        self.assertEqual(self.dojo.un_allocations_text(), dojo.un_allocations_text())
+
+
+if __name__ == '__main__':
+    unittest.main()
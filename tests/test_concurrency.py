@@ -0,0 +1,168 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from classes.dojo import Dojo
+from classes.export import allocation_records, unallocated_records
+from classes.reporter import NullReporter, Reporter
+
+
+class YieldingReporter(Reporter):
+    """
+    Gives up the rest of the thread's time slice on every event
+    """
+
+    def emit(self, event, level, message, **fields):
+        time.sleep(0)
+
+
+def run_threads(count, target):
+    """
+    Runs target(thread_number) on count threads
+    :return: exceptions raised by the threads
+    """
+    errors = []
+
+    def run(thread):
+        try:
+            target(thread)
+        except Exception as error:
+            errors.append(error)
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class TestThreadSafeDojo(unittest.TestCase):
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        # switch threads as often as possible to provoke races
+        sys.setswitchinterval(1e-6)
+        self.dojo = Dojo(NullReporter(), thread_safe=True)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def assert_no_room_over_allocated(self):
+        for room in self.dojo.all_offices + self.dojo.all_living_spaces:
+            self.assertGreaterEqual(room.spaces, 0)
+            self.assertEqual(len(room.occupants), room.capacity - room.spaces)
+
+    def test_concurrent_adds_never_over_allocate(self):
+        self.dojo.create_room(['office%d' % i for i in range(100)], 'office')
+        self.dojo.create_room(['living%d' % i for i in range(50)], 'living_space')
+
+        def add_people(thread):
+            for i in range(150):
+                if i % 2:
+                    self.dojo.add_staff('staff %d %d' % (thread, i))
+                else:
+                    self.dojo.add_fellow('fellow %d %d' % (thread, i), 'Y')
+        self.assertEqual(run_threads(8, add_people), [])
+
+        self.assert_no_room_over_allocated()
+        self.assertEqual(len(self.dojo.people), 1200)
+        self.assertEqual(len(self.dojo.free_offices), 0)
+        self.assertEqual(len(self.dojo.fellows_not_allocated_office) +
+                         len(self.dojo.staff_not_allocated), 1200 - 600)
+        self.assertEqual(len(self.dojo.fellows_not_allocated_living_space), 600 - 200)
+
+    def test_concurrent_reallocations_to_the_last_space(self):
+        self.dojo.create_room(['blue'], 'office')
+        for i in range(6):
+            self.dojo.add_staff('staff%d' % i)
+        self.dojo.create_room(['red'], 'office')
+        for i in range(5):
+            self.dojo.add_staff('other%d' % i)
+        results = []
+
+        def move(thread):
+            results.append(self.dojo.re_allocate_person('staff%d' % thread, 'red'))
+        self.assertEqual(run_threads(6, move), [])
+
+        self.assertEqual(results.count('Room already full'), 5)
+        self.assert_no_room_over_allocated()
+
+    def test_reports_run_alongside_adds(self):
+        self.dojo.create_room(['office%d' % i for i in range(20)], 'office')
+        self.dojo.create_room(['living%d' % i for i in range(10)], 'living_space')
+
+        def add_or_report(thread):
+            for i in range(300):
+                if thread == 0:
+                    self.dojo.add_staff('staff %d' % i)
+                    self.dojo.add_fellow('fellow %d' % i, 'Y')
+                else:
+                    self.dojo.un_allocations_text()
+                    self.dojo.allocations_text()
+                    list(allocation_records(self.dojo))
+                    list(unallocated_records(self.dojo))
+        self.assertEqual(run_threads(3, add_or_report), [])
+
+        self.assert_no_room_over_allocated()
+        self.assertEqual(len(list(unallocated_records(self.dojo))),
+                         600 - 120 + 300 - 40)
+
+    def test_adds_alongside_journal_compaction(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'dojo.journal')
+        self.dojo.create_room(['office%d' % i for i in range(20)], 'office')
+        self.dojo.create_room(['living%d' % i for i in range(10)], 'living_space')
+        self.dojo.open_journal(path, compact_every=3)
+
+        def add_people(thread):
+            for i in range(40):
+                self.dojo.add_staff('staff %d %d' % (thread, i))
+                self.dojo.add_fellow('fellow %d %d' % (thread, i), 'Y')
+        try:
+            self.assertEqual(run_threads(8, add_people), [])
+            self.dojo.close_journal()
+            replayed = Dojo(NullReporter())
+            replayed.open_journal(path)
+            replayed.close_journal()
+        finally:
+            shutil.rmtree(directory)
+
+        self.assert_no_room_over_allocated()
+        self.assertEqual(len(replayed.people), 640)
+        self.assertEqual(sorted((room.name, room.spaces) for room in replayed.rooms.values()),
+                         sorted((room.name, room.spaces) for room in self.dojo.rooms.values()))
+        self.assertEqual(len(replayed.staff_not_allocated), len(self.dojo.staff_not_allocated))
+
+    def test_snapshots_alongside_adds(self):
+        directory = tempfile.mkdtemp()
+        # a reporter that hands over to other threads in the middle of every add
+        self.dojo = Dojo(YieldingReporter(), thread_safe=True)
+        self.dojo.create_room(['office%d' % i for i in range(20)], 'office')
+        self.dojo.create_room(['living%d' % i for i in range(10)], 'living_space')
+
+        def add_or_save(thread):
+            if thread < 4:
+                for i in range(100):
+                    self.dojo.add_staff('staff %d %d' % (thread, i))
+                    self.dojo.add_fellow('fellow %d %d' % (thread, i), 'Y')
+            else:
+                # keep saving for as long as people are being added
+                while len(self.dojo.people) < 800:
+                    self.dojo.save_snapshot(os.path.join(directory, 'snapshot%d' % thread))
+        try:
+            self.assertEqual(run_threads(6, add_or_save), [])
+            path = os.path.join(directory, 'final')
+            self.dojo.save_snapshot(path)
+            loaded = Dojo(NullReporter())
+            loaded.load_snapshot(path)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assert_no_room_over_allocated()
+        self.assertEqual(len(loaded.people), 800)
+        self.assertEqual(len(loaded.staff_not_allocated), len(self.dojo.staff_not_allocated))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from classes.dojo import Dojo
+from classes.export import export_allocations, export_unallocated, write_columnar
+from classes.reporter import NullReporter
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dojo = Dojo(NullReporter())
+        self.dojo.add_fellow('Samuel', 'N')
+        self.dojo.add_staff('Dona')
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        self.dojo.add_fellow('Patrick', 'Y')
+        self.dojo.add_staff('Jim')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_export_allocations_csv(self):
+        path = self.path('allocations.csv')
+        export_allocations(self.dojo, path, 'csv')
+        with open(path, newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows, [['room', 'room_type', 'person', 'person_type'],
+                                ['blue', 'office', 'Patrick', 'Fellow'],
+                                ['blue', 'office', 'Jim', 'Staff'],
+                                ['Apple', 'living_space', 'Patrick', 'Fellow']])
+
+    def test_export_unallocated_gzipped_jsonl(self):
+        path = self.path('unallocated.jsonl.gz')
+        export_unallocated(self.dojo, path, 'jsonl')
+        with gzip.open(path, 'rt') as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(records, [
+            {'person': 'Samuel', 'person_type': 'Fellow', 'unallocated': 'office'},
+            {'person': 'Dona', 'person_type': 'Staff', 'unallocated': 'office'}])
+
+    def test_export_allocations_columnar(self):
+        path = self.path('allocations.json')
+        export_allocations(self.dojo, path, 'columnar', compress=True)
+        with gzip.open(path, 'rt') as file:
+            data = json.load(file)
+        self.assertEqual(data['fields'], ['room', 'room_type', 'person', 'person_type'])
+        self.assertEqual(data['columns']['person'], ['Patrick', 'Jim', 'Patrick'])
+        self.assertEqual(data['columns']['room'], ['blue', 'blue', 'Apple'])
+
+    def test_columnar_reads_the_records_once(self):
+        passes = []
+
+        def records():
+            # every pass sees one more record, as with adds running alongside
+            passes.append(None)
+            return [(str(i), i) for i in range(len(passes))]
+        file = io.StringIO()
+        write_columnar(records, ('name', 'number'), file)
+        self.assertEqual(len(passes), 1)
+        self.assertEqual(json.loads(file.getvalue())['columns'],
+                         {'name': ['0'], 'number': [0]})
+
+    def test_export_text_matches_report(self):
+        path = self.path('allocations.txt')
+        export_allocations(self.dojo, path, 'text')
+        with open(path) as file:
+            self.assertEqual(file.read(), self.dojo.allocations_text())
+
+    def test_export_unknown_format(self):
+        self.assertRaises(ValueError, export_allocations, self.dojo,
+                          self.path('allocations.xml'), 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
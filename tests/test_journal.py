@@ -0,0 +1,161 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from classes.dojo import Dojo
+from classes.pool import oldest_waiting
+from classes.reporter import NullReporter
+from tests.test_concurrency import YieldingReporter
+
+
+def waiting_order(dojo):
+    return [(person.name, dojo.waiting_lists().index(waiting_list))
+            for person, waiting_list in oldest_waiting(dojo.waiting_lists(),
+                                                       len(dojo.people) * 2)]
+
+
+def allocations(dojo):
+    return sorted((room.name, sorted(person.name for person in room.occupants))
+                  for room in dojo.all_offices + dojo.all_living_spaces)
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dojo.journal')
+        self.dojo = Dojo(NullReporter())
+
+    def tearDown(self):
+        self.dojo.close_journal()
+        shutil.rmtree(self.directory)
+
+    def populate(self):
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        for i in range(8):
+            self.dojo.add_fellow('fellow%d' % i, 'Y')
+        self.dojo.create_room(['red'], 'office')
+        moved = self.dojo.get_room('blue').occupants[0]
+        self.dojo.re_allocate_person(moved.name, 'red')
+        return moved
+
+    def reopen(self):
+        self.dojo.close_journal()
+        dojo = Dojo(NullReporter())
+        dojo.open_journal(self.path)
+        return dojo
+
+    def test_replay_restores_rooms_and_waiting_lists(self):
+        self.dojo.open_journal(self.path)
+        moved = self.populate()
+        dojo = self.reopen()
+        self.assertEqual(allocations(dojo), allocations(self.dojo))
+        self.assertEqual(dojo.get_person(moved.name).office.name, 'red')
+        self.assertEqual(len(dojo.fellows_not_allocated_office), 2)
+        self.assertEqual(len(dojo.fellows_not_allocated_living_space), 4)
+        self.assertEqual(dojo.get_room('blue').spaces, 1)
+        self.dojo = dojo
+
+    def test_compaction_keeps_the_journal_short(self):
+        self.dojo.open_journal(self.path, compact_every=5)
+        self.populate()
+        self.assertTrue(os.path.exists(self.path + '.snapshot'))
+        with open(self.path) as file:
+            self.assertLess(len(file.readlines()), 10)
+        dojo = self.reopen()
+        self.assertEqual(allocations(dojo), allocations(self.dojo))
+        self.dojo = dojo
+
+    def test_torn_last_record_is_dropped(self):
+        self.dojo.open_journal(self.path)
+        self.populate()
+        self.dojo.close_journal()
+        with open(self.path, 'ab') as file:
+            file.write(b'[999,"enter",0')
+        dojo = self.reopen()
+        self.assertEqual(allocations(dojo), allocations(self.dojo))
+        dojo.create_room(['green'], 'office')
+        self.dojo = dojo
+        self.dojo = self.reopen()
+        self.assertTrue(self.dojo.get_room('green'))
+
+    def test_crash_before_the_journal_is_emptied(self):
+        self.dojo.open_journal(self.path)
+        self.populate()
+        self.dojo.journal.sync()
+        with open(self.path, 'rb') as file:
+            journal = file.read()
+        self.dojo.compact_journal()
+        self.dojo.close_journal()
+        # the snapshot was written but the journal still holds everything
+        with open(self.path, 'wb') as file:
+            file.write(journal)
+        dojo = self.reopen()
+        self.assertEqual(allocations(dojo), allocations(self.dojo))
+        self.assertEqual(len(dojo.all_fellows), 8)
+        self.dojo = dojo
+
+    def test_state_from_before_the_journal_is_kept(self):
+        moved = self.populate()
+        self.dojo.open_journal(self.path)
+        dojo = self.reopen()
+        self.assertEqual(allocations(dojo), allocations(self.dojo))
+        self.assertEqual(dojo.get_person(moved.name).office.name, 'red')
+        self.dojo = dojo
+
+    def test_waiting_order_survives_replay_and_compaction(self):
+        self.dojo.open_journal(self.path)
+        for i in range(5):
+            self.dojo.add_staff('staff%d' % i)
+            self.dojo.add_fellow('fellow%d' % i, 'Y')
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.fill_from_waiting_lists()
+        self.dojo.add_staff('late')
+        order = waiting_order(self.dojo)
+        dojo = self.reopen()
+        self.assertEqual(waiting_order(dojo), order)
+        dojo.compact_journal()
+        self.dojo = dojo
+        dojo = self.reopen()
+        self.assertEqual(waiting_order(dojo), order)
+
+        self.dojo.create_room(['red'], 'office', backfill='fifo')
+        dojo.create_room(['red'], 'office', backfill='fifo')
+        self.assertEqual(waiting_order(dojo), waiting_order(self.dojo))
+        self.dojo = dojo
+
+    def test_thread_safe_journal_with_frequent_compaction(self):
+        # a reporter that hands over to other threads in the middle of every add
+        self.dojo = Dojo(YieldingReporter(), thread_safe=True)
+        self.dojo.open_journal(self.path, compact_every=3)
+        self.dojo.create_room(['blue', 'red'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+
+        def add_people(thread):
+            for i in range(20):
+                self.dojo.add_staff('staff%d-%d' % (thread, i))
+                self.dojo.add_fellow('fellow%d-%d' % (thread, i), 'Y')
+        threads = [threading.Thread(target=add_people, args=(i,)) for i in range(8)]
+        switch_interval = sys.getswitchinterval()
+        # switch threads as often as possible so adds and compactions interleave
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+        order = waiting_order(self.dojo)
+        dojo = self.reopen()
+        self.assertEqual(len(dojo.people), 320)
+        self.assertEqual(allocations(dojo), allocations(self.dojo))
+        self.assertEqual(waiting_order(dojo), order)
+        self.dojo = dojo
+
+
+if __name__ == '__main__':
+    unittest.main()
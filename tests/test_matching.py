@@ -0,0 +1,66 @@
+import unittest
+from itertools import permutations
+from classes.matching import MinCostFlow, assign_with_preferences
+from classes.room import Office, Staff
+
+
+def cost(assignment, preferences, fallback_cost):
+    return sum(preferences[person].index(room)
+               if room in preferences.get(person, []) else fallback_cost
+               for person, room in assignment)
+
+
+class TestMinCostFlow(unittest.TestCase):
+    def test_picks_cheapest_paths(self):
+        network = MinCostFlow(4)
+        network.add_edge(0, 1, 2, 1)
+        network.add_edge(0, 2, 2, 4)
+        network.add_edge(1, 3, 1, 1)
+        network.add_edge(1, 2, 1, 1)
+        network.add_edge(2, 3, 2, 1)
+        self.assertEqual(network.solve(0, 3), (3, 10))
+
+
+class TestAssignWithPreferences(unittest.TestCase):
+    def test_contended_room_goes_to_who_needs_it(self):
+        blue, red = Office('blue'), Office('red')
+        blue.spaces, red.spaces = 1, 1
+        jim, dona = Staff('Jim'), Staff('Dona')
+        # Jim is happy in either room, Dona only wants blue
+        preferences = {jim: [blue, red], dona: [blue]}
+        assignment = dict(assign_with_preferences([jim, dona], [blue, red], preferences))
+        self.assertEqual(assignment, {jim: red, dona: blue})
+
+    def test_matches_brute_force(self):
+        rooms = [Office('room%d' % i) for i in range(3)]
+        for room, spaces in zip(rooms, (1, 2, 1)):
+            room.spaces = spaces
+        people = [Staff('person%d' % i) for i in range(5)]
+        preferences = {people[0]: [rooms[0], rooms[1]],
+                       people[1]: [rooms[0]],
+                       people[2]: [rooms[0], rooms[2]],
+                       people[3]: [rooms[2], rooms[1]]}
+        slots = [rooms[0], rooms[1], rooms[1], rooms[2]]
+        best = min(cost(zip(order, slots), preferences, 3)
+                   for order in permutations(people, 4))
+        assignment = assign_with_preferences(people, rooms, preferences)
+        placed = [(person, room) for person, room in assignment if room]
+        self.assertEqual(len(placed), 4)
+        self.assertEqual(cost(placed, preferences, 3), best)
+
+    def test_people_without_space_are_paired_with_none(self):
+        blue = Office('blue')
+        blue.spaces = 1
+        jim, dona = Staff('Jim'), Staff('Dona')
+        assignment = assign_with_preferences([jim, dona], [blue], {jim: [blue]})
+        self.assertEqual(dict(assignment), {jim: blue, dona: None})
+
+    def test_people_without_preferences_are_spread_across_rooms(self):
+        used = set()
+        for _ in range(20):
+            rooms = [Office('office%d' % i) for i in range(10)]
+            people = [Staff('staff%d' % i) for i in range(6)]
+            assignment = assign_with_preferences(people, rooms, {})
+            self.assertTrue(all(room for _, room in assignment))
+            used.update(room.name for _, room in assignment)
+        self.assertGreater(len(used), 1)
@@ -1,13 +1,16 @@
 import unittest
-from classes.office import Office
+from classes.room import Office
 
 class OfficeTestCase(unittest.TestCase):
 
     def setUp(self):
-        self.office = Office()
+        self.office = Office('blue')
 
-    def test_something(self):
-        self.assertEqual(True, False)
+    def test_new_office_has_six_spaces(self):
+        self.assertEqual(self.office.name, 'blue')
+        self.assertEqual(self.office.spaces, 6)
+        self.assertTrue(self.office.contains_space())
+        self.assertEqual(self.office.occupants, [])
 
 
 if __name__ == '__main__':
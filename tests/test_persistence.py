@@ -0,0 +1,159 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from classes.dojo import Dojo
+from modals.table_def import is_legacy_schema, migrate_legacy_schema, \
+    database_url, get_engine
+from classes.reporter import BufferedReporter, NullReporter
+
+
+class TestPersistence(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = os.path.join(self.directory, 'state')
+        self.dojo = Dojo(NullReporter())
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        self.dojo.add_fellow('Patrick', 'Y')
+        self.dojo.add_fellow('Jim')
+        self.dojo.add_staff('Samuel')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def rows(self, query):
+        connection = sqlite3.connect(self.db + '.db')
+        try:
+            return connection.execute(query).fetchall()
+        finally:
+            connection.close()
+
+    def test_save_state_writes_every_table(self):
+        self.dojo.save_state(self.db)
+        self.assertEqual(self.rows('select name, spaces from office'), [('blue', 3)])
+        self.assertEqual(self.rows('select name, spaces from living_space'),
+                         [('Apple', 3)])
+        self.assertEqual(self.rows('select name, office_id from staff'),
+                         [('Samuel', 1)])
+        self.assertEqual(self.rows('select name, office_id, living_space_id from fellow'),
+                         [('Patrick', 1, 1), ('Jim', 1, None)])
+
+    def test_save_state_replaces_previous_save(self):
+        self.dojo.save_state(self.db)
+        self.dojo.save_state(self.db)
+        self.assertEqual(self.rows('select count(*) from fellow'), [(2,)])
+
+    def test_second_save_only_writes_changes(self):
+        self.dojo.save_state(self.db)
+        self.dojo.create_room(['red'], 'office')
+        self.dojo.reporter = BufferedReporter()
+        self.dojo.re_allocate_person('Jim', 'red')
+        self.dojo.save_state(self.db)
+        # red and blue offices plus Jim
+        self.assertEqual(self.dojo.reporter.events[-1][3], {'changes': 3})
+        self.assertEqual(self.rows('select office_id, name, spaces from office'),
+                         [(1, 'blue', 4), (2, 'red', 5)])
+        self.assertEqual(self.rows('select id, name, office_id from fellow'),
+                         [(1, 'Patrick', 1), (2, 'Jim', 2)])
+        self.assertFalse(self.dojo.dirty_objects)
+
+    def test_save_to_another_database_writes_everything(self):
+        self.dojo.save_state(self.db)
+        other = os.path.join(self.directory, 'other')
+        self.dojo.save_state(other)
+        self.db = other
+        self.assertEqual(self.rows('select count(*) from fellow'), [(2,)])
+        self.assertEqual(self.rows('select count(*) from office'), [(1,)])
+
+    def test_load_state_restores_rooms_and_people(self):
+        self.dojo.add_fellow('Sebu', 'Y')
+        self.dojo.add_fellow('Fred', 'Y')
+        self.dojo.add_fellow('Dona', 'Y')
+        self.dojo.add_fellow('Mari', 'Y')
+        self.dojo.save_state(self.db)
+        dojo = Dojo(NullReporter())
+        dojo.load_state(self.db)
+        self.assertEqual(len(dojo.all_fellows), 6)
+        self.assertEqual(len(dojo.all_staff), 1)
+        blue = dojo.get_room('blue')
+        self.assertEqual([person.name for person in blue.occupants],
+                         ['Samuel', 'Patrick', 'Jim', 'Sebu', 'Fred', 'Dona'])
+        self.assertEqual(dojo.get_person('Patrick').living_place.name, 'Apple')
+        self.assertEqual(len(dojo.get_room('Apple').occupants), 4)
+        self.assertEqual(list(dojo.fellows_not_allocated_office),
+                         [dojo.get_person('Mari')])
+        self.assertEqual(list(dojo.fellows_not_allocated_living_space),
+                         [dojo.get_person('Mari')])
+        self.assertFalse(dojo.get_available_office())
+        self.assertFalse(dojo.dirty_objects)
+
+    def test_migrate_legacy_schema(self):
+        connection = sqlite3.connect(self.db + '.db')
+        connection.executescript(
+            "CREATE TABLE office (office_id INTEGER PRIMARY KEY, name VARCHAR, spaces INTEGER);"
+            "CREATE TABLE living_space (id INTEGER PRIMARY KEY, name VARCHAR, spaces INTEGER);"
+            "CREATE TABLE staff (id INTEGER PRIMARY KEY, name VARCHAR(50), office VARCHAR(25));"
+            "CREATE TABLE fellow (id INTEGER PRIMARY KEY, name VARCHAR(50), "
+            "office VARCHAR(25), living_space VARCHAR(25), wants_accomodation VARCHAR(2));"
+            "INSERT INTO office VALUES (1, 'blue', 4), (2, 'red', 6);"
+            "INSERT INTO living_space VALUES (1, 'Apple', 3);"
+            "INSERT INTO staff VALUES (1, 'Samuel', 'red');"
+            "INSERT INTO fellow VALUES (1, 'Patrick', 'blue', 'Apple', 'Y'), "
+            "(2, 'Jim', 'blue', NULL, 'N');")
+        connection.commit()
+        connection.close()
+
+        engine = create_engine('sqlite:///' + self.db + '.db')
+        self.assertTrue(is_legacy_schema(engine))
+        self.assertTrue(migrate_legacy_schema(engine))
+        self.assertFalse(migrate_legacy_schema(engine))
+        engine.dispose()
+        self.assertEqual(self.rows('select name, office_id from staff'), [('Samuel', 2)])
+        self.assertEqual(self.rows('select name, office_id, living_space_id, '
+                                   'wants_accomodation from fellow'),
+                         [('Patrick', 1, 1, 'Y'), ('Jim', 1, None, 'N')])
+
+    def test_database_url(self):
+        self.assertEqual(database_url(self.db), 'sqlite:///' + self.db + '.db')
+        self.assertEqual(database_url(self.db + '.sqlite'),
+                         'sqlite:///' + self.db + '.sqlite')
+        self.assertEqual(database_url('sqlite:///:memory:'), 'sqlite:///:memory:')
+
+    def test_engine_is_reused(self):
+        self.assertIs(get_engine(self.db), get_engine(self.db + '.db'))
+        self.assertIs(get_engine(self.db), get_engine('sqlite:///' + self.db + '.db'))
+
+    def test_sqlite_pragmas(self):
+        self.dojo.save_state(self.db)
+        self.assertEqual(self.rows('pragma journal_mode'), [('wal',)])
+        with get_engine(self.db).connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('pragma synchronous').scalar(), 1)
+            self.assertEqual(connection.exec_driver_sql('pragma busy_timeout').scalar(), 5000)
+
+    def test_save_and_load_state_with_url(self):
+        url = 'sqlite:///' + os.path.join(self.directory, 'url.sqlite')
+        self.dojo.save_state(url)
+        dojo = Dojo(NullReporter())
+        dojo.load_state(url)
+        self.assertEqual(dojo.get_person('Patrick').office.name, 'blue')
+
+    def test_load_state_while_a_save_is_open(self):
+        self.dojo.save_state(self.db)
+        writer = sqlite3.connect(self.db + '.db')
+        try:
+            writer.execute('begin immediate')
+            writer.execute("insert into office (name, spaces) values ('red', 6)")
+            dojo = Dojo(NullReporter())
+            dojo.load_state(self.db)
+            self.assertTrue(dojo.is_room_exists('blue'))
+            self.assertFalse(dojo.is_room_exists('red'))
+        finally:
+            writer.rollback()
+            writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
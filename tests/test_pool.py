@@ -0,0 +1,82 @@
+import unittest
+from itertools import count
+from classes.pool import RoomPool, WaitingList, oldest_waiting
+from classes.room import Office, Staff
+
+
+class TestRoomPool(unittest.TestCase):
+    def test_pick_drops_full_rooms(self):
+        pool = RoomPool()
+        blue, red = Office('blue'), Office('red')
+        pool.add(blue)
+        pool.add(red)
+        self.assertIn(pool.pick(), (blue, red))
+        blue.spaces = 0
+        red.spaces = 0
+        self.assertIsNone(pool.pick())
+        self.assertEqual(len(pool), 0)
+
+    def test_free_spaces_follow_adds_updates_and_discards(self):
+        pool = RoomPool()
+        rooms = [Office('office%d' % i) for i in range(10)]
+        for room in rooms:
+            pool.add(room)
+        self.assertEqual(pool.free_spaces(), 60)
+        rooms[3].spaces = 2
+        pool.update(rooms[3])
+        pool.discard(rooms[0])
+        pool.discard(rooms[9])
+        self.assertEqual(pool.free_spaces(), 44)
+        for position in range(len(pool)):
+            self.assertEqual(pool.prefix(position + 1),
+                             sum(room.spaces for room in pool.rooms[:position + 1]))
+
+    def test_draw_spaces_never_overfills_a_room(self):
+        pool = RoomPool()
+        blue, red = Office('blue'), Office('red')
+        blue.spaces = 1
+        pool.add(blue)
+        pool.add(red)
+        drawn = pool.draw_spaces(10)
+        self.assertEqual(len(drawn), 7)
+        self.assertEqual(drawn.count(blue), 1)
+        self.assertEqual(drawn.count(red), 6)
+        # drawing takes nothing, the spaces are still free
+        self.assertEqual(pool.free_spaces(), 7)
+
+    def test_draw_spaces_corrects_rooms_changed_outside_the_pool(self):
+        pool = RoomPool()
+        blue, red = Office('blue'), Office('red')
+        pool.add(blue)
+        pool.add(red)
+        blue.spaces = 0
+        self.assertEqual(pool.draw_spaces(10), [red] * 6)
+        self.assertEqual(pool.free_spaces(), 6)
+
+
+class TestWaitingList(unittest.TestCase):
+    def test_membership_and_removal(self):
+        waiting = WaitingList()
+        jim, dona = Staff('Jim'), Staff('Dona')
+        waiting.append(jim)
+        waiting.append(dona)
+        waiting.append(jim)
+        self.assertEqual(list(waiting), [jim, dona])
+        waiting.remove(jim)
+        self.assertNotIn(jim, waiting)
+        self.assertRaises(ValueError, waiting.remove, jim)
+
+    def test_oldest_waiting_across_lists(self):
+        tickets = count()
+        first, second = WaitingList(tickets), WaitingList(tickets)
+        people = [Staff('person%d' % i) for i in range(4)]
+        first.append(people[0])
+        second.append(people[1])
+        first.append(people[2])
+        second.append(people[3])
+        self.assertEqual(oldest_waiting([first, second], 3),
+                         [(people[0], first), (people[1], second), (people[2], first)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import io
+import json
+import unittest
+from classes.dojo import Dojo
+from classes.reporter import BufferedReporter, JsonLinesReporter, NullReporter
+
+
+class TestReporter(unittest.TestCase):
+    def test_buffered_reporter_collects_events(self):
+        reporter = BufferedReporter()
+        dojo = Dojo(reporter)
+        dojo.create_room(['blue'], 'office')
+        dojo.add_staff('Jim')
+        events = [event[0] for event in reporter.events]
+        self.assertEqual(events, ['office_created', 'staff_added'])
+        self.assertEqual(reporter.events[1][3], {'name': 'Jim', 'room': 'blue'})
+
+    def test_flush_forwards_and_clears_events(self):
+        buffered = BufferedReporter()
+        dojo = Dojo(buffered)
+        dojo.add_fellow('Jim')
+        stream = io.StringIO()
+        buffered.flush(JsonLinesReporter(stream))
+        self.assertEqual(buffered.events, [])
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(records[1]['event'], 'fellow_unallocated_office')
+        self.assertEqual(records[1]['name'], 'Jim')
+        self.assertIn('Jim is currently unallocated office', records[1]['message'])
+
+    def test_null_reporter_does_not_format_messages(self):
+        NullReporter().emit('event', 'info', '%(missing)s')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from classes.room import Fellow, LivingSpace, Office, Staff
+
+
+class TestRoom(unittest.TestCase):
+    def test_rooms_start_with_their_capacity(self):
+        self.assertEqual(Office('blue').spaces, 6)
+        self.assertEqual(LivingSpace('Apple').spaces, 4)
+
+    def test_people_have_no_instance_dict(self):
+        for obj in (Fellow('Patrick', 'Y'), Staff('Jim'), Office('blue')):
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+    def test_fellow_accommodation_flag_is_boolean(self):
+        self.assertIs(Fellow('Patrick', 'Y').wants_accomodation, True)
+        self.assertIs(Fellow('Patrick', 'N').wants_accomodation, False)
+        self.assertIs(Fellow('Patrick', None).wants_accomodation, False)
+        self.assertIs(Fellow('Patrick', True).wants_accomodation, True)
+
+
+if __name__ == '__main__':
+    unittest.main()
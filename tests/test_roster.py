@@ -0,0 +1,39 @@
+import unittest
+from classes.roster import LoadReport, parse_line, parse_roster, chunked
+
+
+class TestRoster(unittest.TestCase):
+    def test_parse_fellow_line(self):
+        self.assertEqual(parse_line('OLUWAFEMI SULE FELLOW Y\n'),
+                         ('OLUWAFEMI SULE', 'FELLOW', 'Y'))
+
+    def test_parse_fellow_line_without_accomodation(self):
+        self.assertEqual(parse_line('MARI LAWRENCE FELLOW'),
+                         ('MARI LAWRENCE', 'FELLOW', 'N'))
+
+    def test_parse_staff_line(self):
+        self.assertEqual(parse_line('LEIGH RILEY STAFF'),
+                         ('LEIGH RILEY', 'STAFF', 'N'))
+
+    def test_parse_malformed_lines(self):
+        self.assertIsInstance(parse_line('LEIGH STAFF'), str)
+        self.assertIsInstance(parse_line('LEIGH RILEY VISITOR'), str)
+        self.assertIsInstance(parse_line('LEIGH RILEY FELLOW maybe'), str)
+        self.assertIsInstance(parse_line('LEIGH RILEY STAFF Y'), str)
+
+    def test_parse_roster_records_rejects(self):
+        lines = ['A B FELLOW Y\n', '\n', 'C STAFF\n', 'D E STAFF\n']
+        report = LoadReport()
+        people = list(parse_roster(lines, report))
+        self.assertEqual(people, [('A B', 'FELLOW', 'Y'), ('D E', 'STAFF', 'N')])
+        self.assertEqual(report.lines_read, 4)
+        self.assertEqual(report.rejected, 1)
+        self.assertEqual(report.rejects[0][:2], (3, 'C STAFF'))
+
+    def test_chunked(self):
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import unittest
+from classes.service import DojoService, start_service
+
+
+class TestDojoService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = DojoService(batch_window=0.01)
+        self.server = await start_service(self.service, port=0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def send(self, *requests):
+        for request in requests:
+            self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        responses = [json.loads(await self.reader.readline()) for _ in requests]
+        return sorted(responses, key=lambda response: response['id'])
+
+    async def test_concurrent_adds_are_allocated_in_one_batch(self):
+        created, = await self.send({'id': 0, 'op': 'create_room',
+                                    'args': {'room_type': 'office', 'room_names': ['blue']}})
+        self.assertEqual(created['result'], ['blue'])
+        responses = await self.send(*[
+            {'id': i, 'op': 'add_person',
+             'args': {'name': 'person%d' % i, 'person_type': 'STAFF'}}
+            for i in range(8)])
+        self.assertEqual(self.service.batches, 1)
+        offices = [response['result']['office'] for response in responses]
+        self.assertEqual(offices.count('blue'), 6)
+        self.assertEqual(offices.count(None), 2)
+
+        room, unallocated = await self.send({'id': 0, 'op': 'print_room',
+                                             'args': {'room_name': 'blue'}},
+                                            {'id': 1, 'op': 'unallocated'})
+        self.assertEqual(len(room['result']), 6)
+        self.assertEqual(len(unallocated['result']), 2)
+
+    async def test_reallocate_person(self):
+        await self.send({'id': 0, 'op': 'create_room',
+                         'args': {'room_type': 'office', 'room_names': ['blue']}},
+                        {'id': 1, 'op': 'add_person',
+                         'args': {'name': 'JIM KIM', 'person_type': 'STAFF'}})
+        await self.send({'id': 0, 'op': 'create_room',
+                         'args': {'room_type': 'office', 'room_names': ['red']}})
+        moved, missing = await self.send(
+            {'id': 0, 'op': 'reallocate_person',
+             'args': {'name': 'JIM KIM', 'room_name': 'red'}},
+            {'id': 1, 'op': 'reallocate_person',
+             'args': {'name': 'DONA KIM', 'room_name': 'red'}})
+        self.assertEqual(moved['result']['office'], 'red')
+        self.assertFalse(missing['ok'])
+        self.assertEqual(missing['error'], 'Person with name DONA KIM does not exist')
+
+    async def test_bad_requests_get_errors(self):
+        responses = await self.send({'id': 0, 'op': 'fly'},
+                                    {'id': 1, 'op': 'add_person',
+                                     'args': {'name': 'JIM', 'person_type': 'VISITOR'}},
+                                    {'id': 2, 'op': 'print_room', 'args': {'room': 'blue'}})
+        self.assertEqual([response['ok'] for response in responses], [False] * 3)
+        self.writer.write(b'not json\n')
+        response = json.loads(await self.reader.readline())
+        self.assertEqual(response, {'id': None, 'ok': False,
+                                    'error': 'Request is not valid JSON'})
+
+    async def test_bad_name_does_not_fail_the_batch(self):
+        await self.send({'id': 0, 'op': 'create_room',
+                         'args': {'room_type': 'office', 'room_names': ['blue']}})
+        good, bad = await self.send({'id': 0, 'op': 'add_person',
+                                     'args': {'name': 'JIM KIM', 'person_type': 'STAFF'}},
+                                    {'id': 1, 'op': 'add_person',
+                                     'args': {'name': ['x'], 'person_type': 'STAFF'}})
+        self.assertEqual(good['result']['office'], 'blue')
+        self.assertEqual(bad, {'id': 1, 'ok': False,
+                               'error': 'name should be a non-empty string'})
+        self.assertEqual(len(self.service.dojo.all_staff), 1)
+
+    async def test_unexpected_errors_are_reported(self):
+        async def broken():
+            raise RuntimeError('boom')
+        self.service.operations['broken'] = broken
+        response, = await self.send({'id': 0, 'op': 'broken'})
+        self.assertEqual(response, {'id': 0, 'ok': False,
+                                    'error': 'Internal error: RuntimeError: boom'})
+
+    async def test_failed_batch_skips_cancelled_requests(self):
+        def broken(people):
+            raise RuntimeError('boom')
+        self.service.dojo.allocate_batch = broken
+        cancelled = asyncio.ensure_future(self.service.add_person('JIM KIM', 'STAFF'))
+        waiting = asyncio.ensure_future(self.service.add_person('DONA KIM', 'STAFF'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with self.assertRaisesRegex(RuntimeError, 'boom'):
+            await asyncio.wait_for(waiting, 1)
+
+    async def test_create_room_with_unknown_room_type(self):
+        response, = await self.send({'id': 0, 'op': 'create_room',
+                                     'args': {'room_type': 'kitchen', 'room_names': ['blue']}})
+        self.assertEqual(response, {'id': 0, 'ok': False,
+                                    'error': 'room_type should be office or living_space'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+from classes.dojo import Dojo
+from classes.reporter import NullReporter
+from classes.snapshot import SnapshotError
+
+
+def allocations(dojo):
+    return [(room.name, room.spaces, [person.name for person in room.occupants])
+            for room in dojo.all_offices + dojo.all_living_spaces]
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'dojo.snapshot')
+        self.dojo = Dojo(NullReporter())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.create_room(['Apple'], 'living_space')
+        for i in range(7):
+            self.dojo.add_fellow('fellow%d' % i, 'Y')
+        self.dojo.add_staff('Jim')
+        self.dojo.add_staff('fellow0')
+        self.dojo.save_snapshot(self.path)
+
+        loaded = Dojo(NullReporter())
+        self.assertEqual(loaded.load_snapshot(self.path), (2, 9))
+        self.assertEqual(allocations(loaded), allocations(self.dojo))
+        for waiting_list in ('fellows_not_allocated_office',
+                             'fellows_not_allocated_living_space', 'staff_not_allocated'):
+            self.assertEqual([person.name for person in getattr(loaded, waiting_list)],
+                             [person.name for person in getattr(self.dojo, waiting_list)])
+        # the first person with a name keeps it
+        self.assertEqual(str(loaded.get_person('fellow0')), 'Fellow')
+        fellow = loaded.get_person('fellow3')
+        self.assertIn(fellow, fellow.office.occupants)
+        self.assertEqual(fellow.wants_accomodation, True)
+        self.assertEqual(len(loaded.free_offices), 0)
+        self.assertEqual(len(loaded.free_living_spaces), 0)
+
+        loaded.create_room(['red'], 'office')
+        loaded.fill_from_waiting_lists()
+        self.assertEqual(len(loaded.get_room('red').occupants), 3)
+
+    def test_empty_dojo(self):
+        self.dojo.save_snapshot(self.path)
+        self.assertEqual(Dojo(NullReporter()).load_snapshot(self.path), (0, 0))
+
+    def test_missing_file(self):
+        self.assertIsNone(self.dojo.load_snapshot(self.path))
+
+    def test_rejects_other_and_truncated_files(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a snapshot at all')
+        self.assertRaises(SnapshotError, self.dojo.load_snapshot, self.path)
+
+        self.dojo.create_room(['blue'], 'office')
+        self.dojo.save_snapshot(self.path)
+        with open(self.path, 'rb') as file:
+            data = file.read()
+        with open(self.path, 'wb') as file:
+            file.write(data[:-3])
+        self.assertRaises(SnapshotError, Dojo(NullReporter()).load_snapshot, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()